@@ -74,6 +74,77 @@ class FixtureData(object):
         """unload all datasets."""
         self.loader.unload()
 
+class SharedFixtureData(FixtureData):
+    """
+    A :class:`FixtureData` that is loaded once and shared by reference count.
+    
+    Each :meth:`acquire` adds a user, loading all datasets for the first one, 
+    and each :meth:`release` removes a user, unloading all datasets when the 
+    last one is gone.  Since every user sees the same rows, tests sharing 
+    data should treat it as read-only.
+    
+    Typically this is constructed by ``data = fixture.shared_data(...)``, 
+    which acquires it.  Used in a with statement, it is released at the end 
+    of the block.
+    """
+    def __init__(self, datasets, dataclass, loader, scope=None):
+        FixtureData.__init__(self, datasets, dataclass, loader)
+        self.scope = scope
+        self.users = 0
+        self.loaded = None
+
+    def __enter__(self):
+        """enter a with statement block.
+        
+        :meth:`Fixture.shared_data` already acquired self, so this only 
+        returns it.
+        """
+        return self
+
+    def __exit__(self, type, value, traceback):
+        """exit a with statement block.
+        
+        calls self.release()
+        """
+        self.release()
+
+    def acquire(self):
+        """add a user, loading all datasets if this is the first one."""
+        if not self.users:
+            self.setup()
+        self.users += 1
+        return self
+
+    def release(self):
+        """remove a user, unloading all datasets if this was the last one."""
+        if not self.users:
+            raise ValueError(
+                "%r was released more times than it was acquired" % self)
+        self.users -= 1
+        if not self.users:
+            self.teardown()
+
+    def setup(self):
+        """load all datasets, populating self.data."""
+        FixtureData.setup(self)
+        # other data can be loaded while this is shared, so hold on to what 
+        # the loader loaded for us :
+        self.loaded = getattr(self.loader, 'loaded', None)
+
+    def teardown(self):
+        """unload all datasets."""
+        if self.loaded is None:
+            FixtureData.teardown(self)
+            return
+        current = self.loader.loaded
+        self.loader.loaded = self.loaded
+        try:
+            FixtureData.teardown(self)
+        finally:
+            if current is not self.loaded:
+                self.loader.loaded = current
+            self.loaded = None
+
 class Fixture(object):
     """An environment for loading data.
     
@@ -92,12 +163,14 @@ class Fixture(object):
     dataclass = SuperSet
     loader = None
     Data = FixtureData
+    SharedData = SharedFixtureData
                 
     def __init__(self, dataclass=None, loader=None):
         if dataclass:
             self.dataclass = dataclass
         if loader:
             self.loader = loader
+        self.shared = {}
     
     def __iter__(self):
         for k in self.__dict__:
@@ -117,12 +190,18 @@ class Fixture(object):
             optional callable to be executed before test
         teardown
             optional callable to be executed (finally) after test
+        read_only
+            if True, the test promises not to change the data so it is 
+            acquired with :meth:`shared_data` in the scope of the test's 
+            module.  Data is loaded and unloaded around each test unless 
+            something else, like ``setup_module()``, holds on to it.
 
         """
         from nose.tools import with_setup
 
         setup = cfg.get('setup', None)
         teardown = cfg.get('teardown', None)
+        read_only = cfg.get('read_only', False)
 
         def decorate_with_data(routine):
             # passthrough an already decorated routine:
@@ -140,12 +219,19 @@ class Fixture(object):
             else:
                 passthru_teardown = teardown
             
-            def setup_data():
-                data = self.data(*datasets)
-                data.setup()
-                return data
-            def teardown_data(data):
-                data.teardown()
+            if read_only:
+                def setup_data():
+                    return self.shared_data(*datasets, 
+                                            scope=routine.__module__)
+                def teardown_data(data):
+                    data.release()
+            else:
+                def setup_data():
+                    data = self.data(*datasets)
+                    data.setup()
+                    return data
+                def teardown_data(data):
+                    data.teardown()
         
             @wraps(routine)
             def call_routine(*a,**kw):
@@ -217,4 +303,27 @@ class Fixture(object):
     def data(self, *datasets):
         """returns a :class:`FixtureData` object for datasets."""
         return self.Data(datasets, self.dataclass, self.loader)
+    
+    def shared_data(self, *datasets, **cfg):
+        """returns an acquired :class:`SharedFixtureData` object for datasets.
+        
+        The same object is returned for the same datasets in the same scope 
+        and its data is only loaded once, by the first caller.  Each call 
+        must be paired with ``data.release()``; the data is unloaded when 
+        the last user releases it.
+        
+        Keyword arguments:
+        
+        scope
+            any hashable object to share data within, like a module name or 
+            a TestCase class.  Defaults to None, which shares data within 
+            the whole process.
+        
+        """
+        scope = cfg.get('scope', None)
+        key = (scope, datasets)
+        if key not in self.shared:
+            self.shared[key] = self.SharedData(
+                            datasets, self.dataclass, self.loader, scope=scope)
+        return self.shared[key].acquire()
         
\ No newline at end of file
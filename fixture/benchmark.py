@@ -0,0 +1,382 @@
+
+"""Benchmarks for fixture.
+
+Run them with::
+
+    python -m fixture.benchmark --help
+
+The load benchmarks build a synthetic tree of :class:`DataSet
+<fixture.dataset.DataSet>` classes (see :class:`BenchGraph`) and time
+:meth:`FixtureData.setup() <fixture.base.FixtureData.setup>` and
+:meth:`FixtureData.teardown() <fixture.base.FixtureData.teardown>` against
+SQLite with every loader whose library is installed.  The registry
+benchmarks time :class:`ObjRegistry <fixture.util.ObjRegistry>` lookups.
+
+Each benchmark returns a list of result dictionaries, ``--json`` writes
+them out so that runs can be compared.  Times are the best of a few
+repeats.
+"""
+
+import itertools
+import json
+import optparse
+import os
+import platform
+import sys
+import tempfile
+from timeit import Timer, default_timer
+
+from fixture.dataset import DataSet
+from fixture.style import NamedDataStyle
+from fixture.util import ObjRegistry
+
+__all__ = ['BenchGraph', 'bench_load', 'bench_registry']
+
+def best_time(routine, number, repeat=3):
+    """returns the best time in seconds of one call to routine"""
+    return min(Timer(routine).repeat(repeat, number)) / number
+
+def make_datasets(count):
+    """returns instances of count new DataSet classes with one row each"""
+    datasets = []
+    for i in range(count):
+        row = type('row', (object,), {'id': i})
+        ds_class = type(DataSet)('Bench%sData' % i, (DataSet,), {'row': row})
+        datasets.append(ds_class())
+    return datasets
+
+def bench_registry(sizes=(10, 100, 1000, 5000), number=100000):
+    """times :class:`ObjRegistry <fixture.util.ObjRegistry>` lookups in
+    registries holding each number of DataSets in sizes.
+
+    This is the lookup done by ``dataset_registry``, the loader's
+    ``LoadQueue`` and the cache of a :class:`SuperSet
+    <fixture.dataset.SuperSet>`.
+    """
+    results = []
+    datasets = make_datasets(max(sizes))
+    for size in sizes:
+        registry = ObjRegistry()
+        for ds in datasets[:size]:
+            registry.register(ds)
+        probe = datasets[size // 2]
+        probe_class = probe.__class__
+        operations = (
+            ('getitem instance', lambda: registry[probe]),
+            ('getitem class', lambda: registry[probe_class]),
+            ('contains instance', lambda: probe in registry),
+            ('register instance', lambda: registry.register(probe)),
+        )
+        for operation, routine in operations:
+            results.append({
+                'benchmark': 'registry',
+                'operation': operation,
+                'datasets': size,
+                'seconds': best_time(routine, number),
+            })
+    return results
+
+class BenchTable(object):
+    """a DataSet class of a :class:`BenchGraph` and what it references
+
+    name is the storable name of the DataSet
+    """
+    def __init__(self, name, children, dataset):
+        self.name = name
+        self.table = name.lower()
+        self.children = children
+        self.dataset = dataset
+
+class BenchGraph(object):
+    """
+    A tree of DataSet classes for benchmarks.
+
+    ``depth``
+        the number of levels of DataSets, the root is the first level
+
+    ``fanout``
+        the number of DataSets referenced by each DataSet above the last
+        level.  Each row references a row of each of them.
+
+    ``rows``
+        the number of rows in every DataSet
+
+    ``self_refs``
+        if True, every row but the first references the previous row of
+        its own DataSet in a ``parent_id`` column
+
+    Every DataSet is stored in a table named after it with the columns
+    ``id``, ``name``, ``parent_id`` and ``ref<n>_id`` for each child.
+    ``tables`` lists them in load order.
+    """
+    def __init__(self, depth=3, fanout=2, rows=100, self_refs=False):
+        self.depth = depth
+        self.fanout = fanout
+        self.rows = rows
+        self.self_refs = self_refs
+        self.tables = []
+        self.root = self.build(1).dataset
+
+    def params(self):
+        return {'depth': self.depth, 'fanout': self.fanout,
+                'rows': self.rows, 'self_refs': self.self_refs,
+                'datasets': len(self.tables),
+                'total_rows': len(self.tables) * self.rows}
+
+    def build(self, level):
+        children = []
+        if level < self.depth:
+            children = [self.build(level + 1) for i in range(self.fanout)]
+        name = 'Bench%s' % len(self.tables)
+        # keys are padded so that rows load in order of their id
+        key = 'r%%0%dd' % len(str(self.rows))
+        rows = {}
+        for i in range(self.rows):
+            row = {'id': i + 1, 'name': '%s row %s' % (name, i)}
+            for n, child in enumerate(children):
+                row['ref%s_id' % n] = getattr(child.dataset, key % i).ref('id')
+            rows[key % i] = type(key % i, (object,), row)
+        dataset = type(DataSet)(name + 'Data', (DataSet,), rows)
+        if self.self_refs:
+            for i in range(1, self.rows):
+                row = getattr(dataset, key % i)
+                row.parent_id = getattr(dataset, key % (i - 1)).ref('id')
+        table = BenchTable(name, children, dataset)
+        self.tables.append(table)
+        return table
+
+def time_fixture(fixture, graph, repeat):
+    """returns the best and mean times of loading and unloading graph"""
+    setups, teardowns = [], []
+    for i in range(repeat):
+        data = fixture.data(graph.root)
+        started = default_timer()
+        data.setup()
+        setups.append(default_timer() - started)
+        started = default_timer()
+        data.teardown()
+        teardowns.append(default_timer() - started)
+    rows = graph.params()['total_rows']
+    return {
+        'setup_seconds': min(setups),
+        'setup_mean_seconds': sum(setups) / len(setups),
+        'teardown_seconds': min(teardowns),
+        'teardown_mean_seconds': sum(teardowns) / len(teardowns),
+        'rows_per_second': rows / min(setups),
+    }
+
+def sqlalchemy_env(graph, engine, mapped=False):
+    from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table
+    metadata = MetaData()
+    env = {}
+    for t in graph.tables:
+        columns = [Column('id', Integer, primary_key=True),
+                   Column('name', String(100)),
+                   Column('parent_id', Integer,
+                                        ForeignKey('%s.id' % t.table))]
+        for n, child in enumerate(t.children):
+            columns.append(Column('ref%s_id' % n, Integer,
+                                        ForeignKey('%s.id' % child.table)))
+        table = Table(t.table, metadata, *columns)
+        if mapped:
+            env[t.name] = type(t.name, (object,), {})
+            try:
+                from sqlalchemy.orm import registry
+            except ImportError:
+                from sqlalchemy.orm import mapper
+                mapper(env[t.name], table)
+            else:
+                registry().map_imperatively(env[t.name], table)
+        else:
+            env[t.name] = table
+    metadata.create_all(engine)
+    return env
+
+def run_sqlalchemy(graph, dsn, repeat, mapped=False, **loader_kw):
+    from sqlalchemy import create_engine
+    from fixture import SQLAlchemyFixture
+    engine = create_engine(dsn)
+    try:
+        fixture = SQLAlchemyFixture(
+            env=sqlalchemy_env(graph, engine, mapped=mapped), engine=engine,
+            style=NamedDataStyle(), **loader_kw)
+        return time_fixture(fixture, graph, repeat)
+    finally:
+        engine.dispose()
+
+# SQLObject classes are registered by name, each run gets its own registry
+_sqlobject_registries = itertools.count()
+
+def run_sqlobject(graph, dsn, repeat, **loader_kw):
+    from sqlobject import (
+        ForeignKey, SQLObject, StringCol, connectionForURI, sqlhub)
+    from fixture import SQLObjectFixture
+    conn = connectionForURI(dsn)
+    sqlhub.processConnection = conn
+    registry = 'fixture.benchmark.%s' % next(_sqlobject_registries)
+    env = {}
+    for t in graph.tables:
+        sqlmeta = type('sqlmeta', (object,), {'table': t.table,
+                                              'registry': registry})
+        attrs = {'sqlmeta': sqlmeta,
+                 'name': StringCol(),
+                 'parent': ForeignKey(t.name, default=None)}
+        for n, child in enumerate(t.children):
+            attrs['ref%s' % n] = ForeignKey(child.name)
+        env[t.name] = type(t.name, (SQLObject,), attrs)
+        env[t.name].createTable(connection=conn)
+    try:
+        # a transaction would lock the SQLite file against conn
+        fixture = SQLObjectFixture(connection=conn, env=env,
+                                   use_transaction=False,
+                                   style=NamedDataStyle(), **loader_kw)
+        return time_fixture(fixture, graph, repeat)
+    finally:
+        conn.close()
+
+def run_storm(graph, dsn, repeat, **loader_kw):
+    from storm.locals import Int, SQL, Storm, Store, Unicode, create_database
+    from fixture import StormFixture
+    store = Store(create_database(dsn))
+    env = {}
+    for t in graph.tables:
+        columns = ['id integer primary key', 'name text', 'parent_id integer']
+        attrs = {'__storm_table__': t.table, 'id': Int(primary=True),
+                 'name': Unicode(), 'parent_id': Int()}
+        for n, child in enumerate(t.children):
+            columns.append('ref%s_id integer' % n)
+            attrs['ref%s_id' % n] = Int()
+        store.execute(SQL("CREATE TABLE %s (%s)" % (
+                                            t.table, ", ".join(columns))))
+        env[t.name] = type(t.name, (Storm,), attrs)
+    store.commit()
+    try:
+        fixture = StormFixture(store=store, env=env, style=NamedDataStyle(),
+                               **loader_kw)
+        return time_fixture(fixture, graph, repeat)
+    finally:
+        store.close()
+
+def library_version(name):
+    try:
+        module = __import__(name)
+    except ImportError:
+        return None
+    return getattr(module, '__version__', 'unknown')
+
+# name, library, runner, runner keywords
+LOADERS = (
+    ('sqlalchemy-table', 'sqlalchemy', run_sqlalchemy, {}),
+    ('sqlalchemy-mapped', 'sqlalchemy', run_sqlalchemy, {'mapped': True}),
+    ('sqlobject', 'sqlobject', run_sqlobject, {}),
+    ('storm', 'storm', run_storm, {}),
+)
+
+def bench_load(graph, loaders=None, repeat=3, batch=False):
+    """times loading and unloading graph with each of the named loaders
+    (all of them by default) into a new SQLite database.
+
+    Loaders whose library is not installed are skipped.  If batch is True,
+    loaders that support it save rows in batches.
+    """
+    results = []
+    for name, library, runner, runner_kw in LOADERS:
+        if loaders is not None and name not in loaders:
+            continue
+        if library_version(library) is None:
+            continue
+        kw = dict(runner_kw)
+        if batch and library == 'sqlalchemy':
+            kw['batch'] = True
+        fd, filename = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            if library == 'storm':
+                dsn = 'sqlite:%s' % filename
+            else:
+                dsn = 'sqlite:///%s' % filename
+            timing = runner(graph, dsn, repeat, **kw)
+        finally:
+            os.remove(filename)
+        result = {'benchmark': 'load', 'loader': name,
+                  'batch': bool(kw.get('batch')), 'repeat': repeat}
+        result.update(graph.params())
+        result.update(timing)
+        results.append(result)
+    return results
+
+def environment():
+    """describes where the benchmarks ran"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'libraries': dict([(library, library_version(library))
+                           for library in sorted(set(
+                                [l[1] for l in LOADERS]))]),
+    }
+
+def format_results(results):
+    """returns results as a plain text table"""
+    lines = []
+    for result in results:
+        if result['benchmark'] == 'load':
+            lines.append(
+                "%-10s %-20s %-36s setup %8.4fs teardown %8.4fs "
+                "(%d rows/s)" % (
+                result['benchmark'], result['loader'],
+                "depth=%(depth)s, fanout=%(fanout)s, rows=%(rows)s, "
+                "batch=%(batch)s" % result,
+                result['setup_seconds'], result['teardown_seconds'],
+                result['rows_per_second']))
+        else:
+            lines.append("%-10s %-20s %-36s %8.3f usec" % (
+                result['benchmark'], result['operation'],
+                "datasets=%s" % result['datasets'], result['seconds'] * 1e6))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('--depth', type='int', default=3,
+        help="levels of DataSets referencing each other (default: 3)")
+    parser.add_option('--fanout', type='int', default=2,
+        help="DataSets referenced by each DataSet (default: 2)")
+    parser.add_option('--rows', type='int', default=100,
+        help="rows in each DataSet (default: 100)")
+    parser.add_option('--self-refs', action='store_true', default=False,
+        help="make each row reference the previous row of its DataSet")
+    parser.add_option('--batch', action='store_true', default=False,
+        help="save rows in batches where the loader supports it")
+    parser.add_option('--repeat', type='int', default=3,
+        help="times to load and unload the DataSets (default: 3)")
+    parser.add_option('--loader', action='append', dest='loaders',
+        help="only run this loader, can be repeated (choices: %s)" % (
+                                ", ".join([l[0] for l in LOADERS])))
+    parser.add_option('--registry', action='store_true', default=False,
+        help="also run the ObjRegistry micro-benchmarks")
+    parser.add_option('--json', metavar='FILE',
+        help="write results to FILE as JSON ('-' for stdout)")
+    options, args = parser.parse_args(argv)
+
+    graph = BenchGraph(depth=options.depth, fanout=options.fanout,
+                       rows=options.rows, self_refs=options.self_refs)
+    results = bench_load(graph, loaders=options.loaders,
+                         repeat=options.repeat, batch=options.batch)
+    if options.registry:
+        results.extend(bench_registry())
+
+    if options.json:
+        report = {'environment': environment(), 'results': results}
+        if options.json == '-':
+            json.dump(report, sys.stdout, indent=2, sort_keys=True)
+            sys.stdout.write("\n")
+        else:
+            fp = open(options.json, 'w')
+            try:
+                json.dump(report, fp, indent=2, sort_keys=True)
+            finally:
+                fp.close()
+    if options.json != '-':
+        print(format_results(results))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,4 +1,4 @@
 
-__all__ = ['DataSet']
+__all__ = ['DataSet', 'ColumnarDataSet']
 
 from fixture.dataset.dataset import *
\ No newline at end of file
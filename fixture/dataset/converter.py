@@ -1,10 +1,20 @@
 
 """Utilities for converting datasets."""
 
+import csv
 import datetime
 import decimal
+import io
+import mmap
+import os
+import struct
 import types
+from itertools import chain
+from six import PY3, integer_types, string_types
 from fixture.dataset import DataSet, DataRow
+from fixture.dataset.dataset import (
+    ColumnarDataSet, DataSetMeta, Ref, compact_row_class, is_rowlike, 
+    raw_column_values)
 json = None
 try:
     # 2.6
@@ -15,12 +25,6 @@ except ImportError:
     except ImportError:
         pass
 
-def _obj_items(obj):
-    for name in dir(obj):
-        if name.startswith('__'):
-            continue
-        yield name, getattr(obj, name)
-
 def default_json_converter(obj):
     """converts obj to a value safe for JSON serialization."""
     if isinstance(obj, (datetime.date, datetime.datetime, decimal.Decimal, float)):
@@ -79,31 +83,489 @@ def dataset_to_json(dataset, fp=None, default=default_json_converter, wrap=None)
     assert json, (
         "You must have the simplejson or json module installed.  "
         "Neither could be imported")
+    if fp and not wrap:
+        return stream_dataset_to_json(dataset, fp, default=default)
+    objects = list(dataset_to_dicts(dataset))
+    if wrap:
+        objects = wrap(objects)
+    if fp:
+        return json.dump(objects, fp, default=default)
+    else:
+        return json.dumps(objects, default=default)
+
+def dataset_to_dicts(dataset):
+    """yields a dictionary of column values for every row of a 
+    :class:`DataSet <fixture.dataset.DataSet>` class or instance.
+    
+    Columns come from the cached column names of each row class rather 
+    than from ``dir()``.  Callable values, such as references to other 
+    rows, are left out.
+    """
     if isinstance(dataset, type):
         # we got a class so make it an instance
         # so that rows are resolved
         dataset = dataset()
     if not isinstance(dataset, DataSet):
         raise TypeError("First argument must be a class or instance of a DataSet")
-    objects = []
-    for name, row in _obj_items(dataset):
-        try:
-            if not issubclass(row, DataRow):
-                continue
-        except TypeError:
-            continue
-        row_dict = {}
-        for col, val in _obj_items(row):
-            if col=='_reserved_attr' or callable(val):
-                continue
-            row_dict[col] = val
-        objects.append(row_dict)
-    if wrap:
-        objects = wrap(objects)
-    if fp:
-        return json.dump(objects, fp, default=default)
+    for key, row in dataset:
+        yield dict([(col, val) for col, val in raw_column_values(row) 
+                                                if not callable(val)])
+
+def stream_dataset_to_json(dataset, fp, default=default_json_converter, 
+                           lines=False, buffer_size=64 * 1024):
+    """Writes a :class:`DataSet <fixture.dataset.DataSet>` class or 
+    instance to fp as JSON, one row at a time.
+    
+    The output is the same as :func:`dataset_to_json` but rows are encoded 
+    and written as they are read so memory use does not grow with the 
+    size of the DataSet.
+    
+    Keyword Arguments
+    
+    **default**
+      see :func:`dataset_to_json`
+    
+    **lines**
+      If True, write one JSON object per line (JSON Lines) instead of a 
+      JSON array.  :class:`JSONLinesDataSet` can read this back.
+    
+    **buffer_size**
+      Encoded rows are collected until there are about this many 
+      characters, then written with a single ``fp.write()``
+    
+    """
+    assert json, (
+        "You must have the simplejson or json module installed.  "
+        "Neither could be imported")
+    encode = json.JSONEncoder(default=default).encode
+    if lines:
+        opening, separator, closing = '', '\n', '\n'
     else:
-        return json.dumps(objects, default=default)
+        opening, separator, closing = '[', ', ', ']'
+    buffer = [opening]
+    buffered = len(opening)
+    empty = True
+    for obj in dataset_to_dicts(dataset):
+        if not empty:
+            buffer.append(separator)
+        empty = False
+        chunk = encode(obj)
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= buffer_size:
+            fp.write(''.join(buffer))
+            buffer, buffered = [], 0
+    if not (lines and empty):
+        buffer.append(closing)
+    fp.write(''.join(buffer))
+
+# The binary format written by dataset_to_binary() is, in little-endian 
+# order:
+#
+#   the magic bytes and a version byte
+#   one record per row: key, column set, then a value per column
+#   the string table: a count, then a length and utf-8 bytes per string
+#   the column sets: a count, then a count and string ids per set
+#   the name of the DataSet and the names of the DataSets it references
+#   a footer: the offset of the string table, the row count, the magic
+#
+# Keys and names are string ids.  Values start with a tag byte.  Rows of 
+# other DataSets are written as the name of the DataSet and the key.
+BINARY_MAGIC = b'FXDS'
+BINARY_VERSION = 1
+_tag = struct.Struct('<B')
+_uint = struct.Struct('<I')
+_int64 = struct.Struct('<q')
+_double = struct.Struct('<d')
+_footer = struct.Struct('<QI4s')
+(_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STRING, 
+ _ROW, _REF_VALUE, _LIST, _SET) = range(10)
+
+class BinaryWriter(object):
+    """writes the rows of a DataSet in the format read by 
+    :class:`BinaryDataSet`.  See :func:`dataset_to_binary`."""
+    def __init__(self, fp, default=default_json_converter, 
+                 buffer_size=64 * 1024):
+        self.fp = fp
+        self.default = default
+        self.buffer_size = buffer_size
+        self.strings = {}
+        self.column_sets = {}
+        self.offset = 0
+        self.rows = 0
+        self.buffer = []
+        self.buffered = 0
+    
+    def string(self, text):
+        """returns the id of text in the string table"""
+        try:
+            return self.strings[text]
+        except KeyError:
+            self.strings[text] = len(self.strings)
+            return self.strings[text]
+    
+    def column_set(self, columns):
+        """returns the id of a tuple of column names"""
+        try:
+            return self.column_sets[columns]
+        except KeyError:
+            self.column_sets[columns] = len(self.column_sets)
+            return self.column_sets[columns]
+    
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered += len(data)
+        self.offset += len(data)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+    
+    def flush(self):
+        self.fp.write(b''.join(self.buffer))
+        self.buffer, self.buffered = [], 0
+    
+    def write_value(self, value):
+        if value is None:
+            self.write(_tag.pack(_NONE))
+        elif value is True:
+            self.write(_tag.pack(_TRUE))
+        elif value is False:
+            self.write(_tag.pack(_FALSE))
+        elif isinstance(value, integer_types):
+            self.write(_tag.pack(_INT) + _int64.pack(value))
+        elif isinstance(value, float):
+            self.write(_tag.pack(_FLOAT) + _double.pack(value))
+        elif isinstance(value, string_types):
+            self.write(_tag.pack(_STRING) + _uint.pack(self.string(value)))
+        elif is_rowlike(value):
+            self.write(_tag.pack(_ROW) + 
+                       _uint.pack(self.string(value._dataset.__name__)) + 
+                       _uint.pack(self.string(value.__name__)))
+        elif isinstance(value, Ref.Value):
+            self.write(_tag.pack(_REF_VALUE) + 
+                       _uint.pack(self.string(
+                                    value.ref.dataset_class.__name__)) + 
+                       _uint.pack(self.string(value.ref.key)) + 
+                       _uint.pack(self.string(value.attr_name)))
+        elif isinstance(value, (list, tuple, set)):
+            tag = isinstance(value, set) and _SET or _LIST
+            self.write(_tag.pack(tag) + _uint.pack(len(value)))
+            for item in value:
+                self.write_value(item)
+        else:
+            self.write_value(self.default(value))
+    
+    def write_row(self, key, row):
+        items = raw_column_values(row)
+        columns = tuple([name for name, value in items])
+        self.write(_uint.pack(self.string(key)) + 
+                   _uint.pack(self.column_set(columns)))
+        for name, value in items:
+            self.write_value(value)
+        self.rows += 1
+    
+    def write_dataset(self, dataset):
+        self.write(BINARY_MAGIC + _tag.pack(BINARY_VERSION))
+        for key, row in dataset:
+            self.write_row(key, row)
+        
+        strings_offset = self.offset
+        def ids(names):
+            return _uint.pack(len(names)) + b''.join(
+                            [_uint.pack(self.string(name)) for name in names])
+        # ids have to be taken before the string table is written
+        column_sets = sorted(self.column_sets.items(), key=lambda i: i[1])
+        column_sets = [ids(columns) for columns, id in column_sets]
+        names = ids([dataset.__class__.__name__] + 
+                    [ds.__name__ for ds in dataset.meta.references])
+        
+        strings = sorted(self.strings.items(), key=lambda i: i[1])
+        self.write(_uint.pack(len(strings)))
+        for text, id in strings:
+            if not isinstance(text, bytes):
+                text = text.encode('utf-8')
+            self.write(_uint.pack(len(text)) + text)
+        self.write(_uint.pack(len(column_sets)) + b''.join(column_sets))
+        self.write(names)
+        self.write(_footer.pack(strings_offset, self.rows, BINARY_MAGIC))
+        self.flush()
+
+def dataset_to_binary(dataset, fp, default=default_json_converter):
+    """Writes a :class:`DataSet <fixture.dataset.DataSet>` class or 
+    instance to fp (a file opened in binary mode) in a compact binary 
+    format.
+    
+    The file can be loaded with :class:`BinaryDataSet`, which is much 
+    faster than importing a module that declares a large DataSet.  Rows 
+    and Ref values that point to other DataSets are written by name; the 
+    ``BinaryDataSet`` must declare those DataSets in its 
+    ``Meta.references``.
+    
+    Keyword Arguments
+    
+    **default**
+      A callable that takes one argument (an object) and returns a value 
+      that can be written (None, bool, int, float, string, list, tuple or 
+      set).  This will *only* be called if the object cannot be written.  
+      The default converts dates and decimals to strings.
+    
+    """
+    if isinstance(dataset, type):
+        dataset = dataset()
+    if not isinstance(dataset, DataSet):
+        raise TypeError("First argument must be a class or instance of a DataSet")
+    BinaryWriter(fp, default=default).write_dataset(dataset)
+
+class FileDataSet(ColumnarDataSet):
+    """
+    A :class:`ColumnarDataSet <fixture.dataset.ColumnarDataSet>` whose rows 
+    are read from a file every time it is iterated.
+    
+    Rows are not kept by the DataSet, the loader saves them as they are 
+    read so that a large seed file never has to fit in memory.  Since there 
+    are no rows to look at before loading, any DataSets referenced by the 
+    file must be declared in ``Meta.references``.  Rows can still be 
+    referenced by other DataSets with :meth:`row`.
+    
+    ``filename``
+        the path of the file to read
+    
+    ``encoding``
+        the encoding of the file, ``utf-8`` by default
+    
+    ``mmap``
+        if True, the file is memory-mapped instead of read through a 
+        buffered file object
+    
+    ``Meta.batch_size`` defaults to 1000 so that a batch loader saves the 
+    rows in chunks as well.
+    """
+    _reserved_attr = ColumnarDataSet._reserved_attr + (
+                                'filename', 'encoding', 'mmap', 'lines', 'read')
+    filename = None
+    encoding = 'utf-8'
+    mmap = False
+    
+    class Meta(DataSetMeta):
+        batch_size = 1000
+    
+    def __init__(self, default_refclass=None, default_meta=None):
+        if not default_meta:
+            default_meta = FileDataSet.Meta
+        ColumnarDataSet.__init__(self, default_refclass=default_refclass, 
+                                 default_meta=default_meta)
+        # rows are not read until they are loaded, so any column of a 
+        # referenced DataSet may be read:
+        self.meta._columns_read = set(
+                        [(ref, None) for ref in self.meta.references])
+    
+    def __iter__(self):
+        """yields key/row pairs as they are read from the file"""
+        columns, rows = self.read()
+        return self._rows_from_values(columns, rows)
+    
+    def _setdata(self, key, value):
+        """rows are not kept, they are read from the file again when needed"""
+    
+    def data(self):
+        return ()
+    
+    def lines(self):
+        """yields the lines of the file.
+        
+        Lines are text in Python 3 and byte strings in Python 2, where the 
+        csv module cannot read text.
+        """
+        if self.filename is None:
+            raise ValueError(
+                "%s must declare a filename" % self.__class__.__name__)
+        if self.mmap:
+            fp = open(self.filename, 'rb')
+            try:
+                if os.fstat(fp.fileno()).st_size == 0:
+                    # an empty file cannot be mapped
+                    return
+                mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for line in iter(mapped.readline, b''):
+                        if PY3:
+                            line = line.decode(self.encoding)
+                        yield line
+                finally:
+                    mapped.close()
+            finally:
+                fp.close()
+        else:
+            if PY3:
+                fp = io.open(self.filename, encoding=self.encoding, newline='')
+            else:
+                fp = open(self.filename, 'rb')
+            try:
+                for line in fp:
+                    yield line
+            finally:
+                fp.close()
+    
+    def read(self):
+        """returns the column names and an iterator of row values."""
+        raise NotImplementedError
+
+class CSVDataSet(FileDataSet):
+    """
+    A :class:`FileDataSet` read from a CSV file.
+    
+    The first line names the columns unless ``columns`` is declared.  
+    All values are strings, as read by the csv module.  ``dialect`` is 
+    passed to ``csv.reader()``.
+    """
+    _reserved_attr = FileDataSet._reserved_attr + ('dialect',)
+    dialect = 'excel'
+    
+    def read(self):
+        reader = csv.reader(self.lines(), dialect=self.dialect)
+        columns = self.columns
+        if not columns:
+            columns = next(reader, ())
+        return columns, reader
+
+class JSONLinesDataSet(FileDataSet):
+    """
+    A :class:`FileDataSet` read from a JSON Lines file, one JSON object 
+    per line.
+    
+    The columns are the keys of the first object unless ``columns`` is 
+    declared.  A column that is missing from an object is None.
+    """
+    def read(self):
+        assert json, (
+            "You must have the simplejson or json module installed.  "
+            "Neither could be imported")
+        objects = (json.loads(line) for line in self.lines() if line.strip())
+        columns = self.columns
+        if not columns:
+            try:
+                first = next(objects)
+            except StopIteration:
+                return (), iter(())
+            columns = sorted(first.keys())
+            objects = chain([first], objects)
+        return columns, ([obj.get(c) for c in columns] for obj in objects)
+
+class BinaryDataSet(FileDataSet):
+    """
+    A :class:`FileDataSet` read from a file written by 
+    :func:`dataset_to_binary`.
+    
+    Rows keep the keys and columns of the DataSet that was written.  Rows 
+    and Ref values of other DataSets are looked up by name in 
+    ``Meta.references``, references to the written DataSet itself point to 
+    this one.  Without ``mmap`` the whole file is read at once.
+    """
+    _reserved_attr = FileDataSet._reserved_attr + ('records',)
+    
+    def __iter__(self):
+        """yields key/row pairs as they are read from the file"""
+        for key, columns, values in self.records():
+            row_class = compact_row_class(self.__class__, columns)
+            yield (key, row_class(self, key, values))
+    
+    def _rowlike(self, dataset_class, key):
+        if issubclass(dataset_class, ColumnarDataSet):
+            return dataset_class.row(key)
+        return getattr(dataset_class, key)
+    
+    def records(self):
+        """yields the key, column names and values of every row."""
+        if self.filename is None:
+            raise ValueError(
+                "%s must declare a filename" % self.__class__.__name__)
+        fp = open(self.filename, 'rb')
+        try:
+            if self.mmap:
+                buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buf = fp.read()
+            try:
+                for record in self._read_records(buf):
+                    yield record
+            finally:
+                if self.mmap:
+                    buf.close()
+        finally:
+            fp.close()
+    
+    def _read_records(self, buf):
+        if (buf[:len(BINARY_MAGIC)] != BINARY_MAGIC or 
+                len(buf) < _footer.size):
+            raise ValueError("%s is not a DataSet binary file" % self.filename)
+        version = _tag.unpack_from(buf, len(BINARY_MAGIC))[0]
+        if version != BINARY_VERSION:
+            raise ValueError("%s has an unknown version: %s" % (
+                                                    self.filename, version))
+        strings_offset, row_count, magic = _footer.unpack_from(
+                                                buf, len(buf) - _footer.size)
+        
+        class pos:
+            offset = strings_offset
+        def uint():
+            value = _uint.unpack_from(buf, pos.offset)[0]
+            pos.offset += _uint.size
+            return value
+        strings = []
+        for i in range(uint()):
+            length = uint()
+            strings.append(
+                buf[pos.offset:pos.offset + length].decode('utf-8'))
+            pos.offset += length
+        column_sets = []
+        for i in range(uint()):
+            column_sets.append(tuple([strings[uint()] for c in range(uint())]))
+        names = [strings[uint()] for i in range(uint())]
+        
+        datasets = dict([(ds.__name__, ds) for ds in self.meta.references])
+        datasets[names[0]] = self.__class__
+        for name in names[1:]:
+            if name not in datasets:
+                raise ValueError(
+                    "%s references %s, which must be declared in "
+                    "%s.Meta.references" % (
+                        self.filename, name, self.__class__.__name__))
+        
+        def value():
+            tag = _tag.unpack_from(buf, pos.offset)[0]
+            pos.offset += _tag.size
+            if tag == _STRING:
+                return strings[uint()]
+            elif tag == _INT:
+                pos.offset += _int64.size
+                return _int64.unpack_from(buf, pos.offset - _int64.size)[0]
+            elif tag == _NONE:
+                return None
+            elif tag == _TRUE:
+                return True
+            elif tag == _FALSE:
+                return False
+            elif tag == _FLOAT:
+                pos.offset += _double.size
+                return _double.unpack_from(buf, pos.offset - _double.size)[0]
+            elif tag == _ROW:
+                dataset_class = datasets[strings[uint()]]
+                return self._rowlike(dataset_class, strings[uint()])
+            elif tag == _REF_VALUE:
+                dataset_class = datasets[strings[uint()]]
+                row = self._rowlike(dataset_class, strings[uint()])
+                return row.ref(strings[uint()])
+            elif tag == _LIST:
+                return [value() for i in range(uint())]
+            elif tag == _SET:
+                return set([value() for i in range(uint())])
+            raise ValueError("%s has an unknown value at %s" % (
+                                            self.filename, pos.offset - 1))
+        
+        pos.offset = len(BINARY_MAGIC) + _tag.size
+        for i in range(row_count):
+            key = strings[uint()]
+            columns = column_sets[uint()]
+            yield key, columns, [value() for c in columns]
 
 if __name__ == '__main__':
     import doctest
@@ -7,7 +7,7 @@ few variations on it: :class:`SuperSet` and :class:`MergedSuperSet`
 """
 
 import sys
-from inspect import isclass
+from inspect import getmro, isclass
 
 from six import reraise, with_metaclass, PY3, string_types
 
@@ -180,6 +180,67 @@ class DataType(type):
                 cls.decorate_row(attr, name, bases, cls_attr)
                 
         del cls_attr['_primary_key']
+        cls.update_schema()
+    
+    def update_schema(cls):
+        """Compiles the schema of this class and returns it.
+        
+        The schema is stored as ``_schema`` along with the 
+        :func:`class_signature` of the class and of each row class, see 
+        :meth:`current_schema`.
+        """
+        cls._schema = cls.compile_schema()
+        cls._schema_signature = None
+        cls._schema_signature = cls.schema_signature()
+        return cls._schema
+    
+    def schema_signature(cls):
+        """returns the :func:`class_signature` of this class followed by that 
+        of each row class in the compiled schema"""
+        return (class_signature(cls),) + tuple([class_signature(row_class) 
+                            for key, row_class, columns in cls._schema])
+    
+    def current_schema(cls):
+        """Returns the compiled schema, compiling it again if a row was 
+        added to or deleted from the class, or a column to or from one of its 
+        rows, since it was compiled.
+        """
+        if cls.schema_signature() != cls._schema_signature:
+            return cls.update_schema()
+        return cls._schema
+    
+    def compile_schema(cls):
+        """Returns the rows declared as inner classes of a :class:`DataSet` 
+        class, including inherited rows.
+        
+        This is called when the class is created and again by 
+        :meth:`current_schema` when rows or columns were added or deleted 
+        since.  The schema is a tuple of ``(key, row_class, columns)`` in 
+        alphabetical order of key where columns is a tuple of 
+        ``(name, value, references)`` in alphabetical order of name and 
+        references is a tuple of the DataSet classes that value refers to 
+        (or None if value is not a valid column).  :meth:`DataSet.data` 
+        reads the current value of every column but only looks at it again 
+        when it is no longer the compiled value.
+        """
+        schema = []
+        for key in public_dir(cls):
+            row_class = getattr(cls, key)
+            if not is_row_class(row_class):
+                continue
+            columns = []
+            for col_name in public_dir(row_class):
+                col_val = getattr(row_class, col_name)
+                if isinstance(col_val, Ref):
+                    # the .ref attribute
+                    continue
+                try:
+                    refs = column_references(col_val)
+                except TypeError:
+                    refs = None
+                columns.append((col_name, col_val, refs))
+            schema.append((key, row_class, tuple(columns)))
+        return tuple(schema)
     
     def decorate_row(cls, row, name, bases, cls_attr):
         """Each row (an inner class) assigned to a :class:`DataSet` will be customized after it is created.
@@ -256,6 +317,51 @@ class DataType(type):
             row.__bases__ = tuple(new_bases)
             
 
+def class_signature(klass):
+    """returns the number of attributes defined by each class in the MRO of 
+    klass.
+    
+    This changes when an attribute is added to or deleted from any of them 
+    and is much cheaper to check than walking ``dir(klass)``.
+    """
+    return tuple([len(c.__dict__) for c in getmro(klass)])
+
+def public_dir(obj):
+    """yields the names in dir(obj) that do not start with an underscore"""
+    for name in dir(obj):
+        if name.startswith("_"):
+            continue
+        yield name
+
+def column_references(value):
+    """returns a tuple of the DataSet classes a column value refers to.
+    
+    Raises TypeError for lists, tuples or sets that contain something other 
+    than rowlike objects or simple values.
+    """
+    if isinstance(value, (list, tuple, set)):
+        refs = []
+        for c in value:
+            if is_rowlike(c):
+                refs.append(c._dataset)
+            # NOP for Google Datastore (String)ListProperty
+            # could definitely break any other storage mediums
+            # ListProperty supports quite a few more types than these
+            # see appengine.ext.db._ALLOWED_PROPERTY_TYPES
+            elif isinstance(c, (string_types, bool, float, int)):
+                continue
+            else:
+                raise TypeError(
+                    "multi-value columns can only contain "
+                    "rowlike objects, not %s of type %s" % (
+                                    value, type(value)))
+        return tuple(refs)
+    elif is_rowlike(value):
+        return (value._dataset,)
+    elif isinstance(value, Ref.Value):
+        return (value.ref.dataset_class,)
+    return ()
+
 def is_rowlike(candidate):
     """returns True if candidate is *like* a DataRow.
     
@@ -267,7 +373,31 @@ def is_rowlike(candidate):
     return hasattr(candidate, '_dataset') and type(candidate._dataset) in (
                                                             DataType, DataSet)
 
-class DataRow(object):
+class DataRowType(type):
+    """
+    Meta class for :class:`DataRow` classes.
+    
+    Each row class caches its :meth:`DataRow.columns`.  Adding or deleting a 
+    public attribute (or setting ``__bases__``) of any row class starts a 
+    new generation, which invalidates the columns cached by all row classes 
+    since they may have inherited the change.  Changing the value of an 
+    existing attribute, like resolving a reference does, or setting 
+    attributes on row instances does not change any columns.
+    """
+    generation = 0
+    
+    def __setattr__(cls, name, value):
+        added = not name.startswith('_') and not hasattr(cls, name)
+        type.__setattr__(cls, name, value)
+        if added or name == '__bases__':
+            DataRowType.generation += 1
+    
+    def __delattr__(cls, name):
+        type.__delattr__(cls, name)
+        if not name.startswith('_'):
+            DataRowType.generation += 1
+
+class DataRow(with_metaclass(DataRowType, object)):
     """
     a DataSet row, values accessible by attibute or key.
     """
@@ -298,18 +428,124 @@ class DataRow(object):
     def columns(self):
         """Classmethod that yields all attribute names (except reserved attributes) 
         in alphabetical order
+        
+        The names are cached on the class until the next 
+        :class:`DataRowType` generation.
         """
-        for k in dir(self):
-            if k.startswith('_') or k in self._reserved_attr:
-                continue
-            yield k
+        cached = self.__dict__.get('_columns')
+        if cached is None or cached[0] != DataRowType.generation:
+            cached = (DataRowType.generation, tuple([k for k in dir(self) 
+                if not k.startswith('_') and k not in self._reserved_attr]))
+            type.__setattr__(self, '_columns', cached)
+        return iter(cached[1])
+
+class CompactDataRow(object):
+    """
+    a compact DataSet row, values accessible by attribute or key.
+    
+    This is used instead of a :class:`DataRow` class per row when the 
+    DataSet's ``Meta.compact`` is True.  All rows of a DataSet that have the 
+    same columns share one subclass (see :func:`compact_row_class`) which 
+    knows the column names, so that each row only keeps a tuple of values 
+    in ``__slots__``.  Undefined attributes are fetched from the stored 
+    object, just like :class:`DataRow`.
+    """
+    __slots__ = ('_dataset', '_key', '_values')
+    _reserved_attr = ('columns',)
+    _columns = ()
+    _positions = {}
+    
+    def __init__(self, dataset, key, values):
+        object.__setattr__(self, '_dataset', dataset)
+        object.__setattr__(self, '_key', key)
+        object.__setattr__(self, '_values', tuple(values))
+    
+    def __repr__(self):
+        return "<%s %s at %s>" % (
+                self.__class__.__name__, self._key, hex(id(self)))
+    
+    def __getitem__(self, item):
+        """self['foo'] works the same as self.foo"""
+        return getattr(self, item)
+    
+    def __getattr__(self, name):
+        """Columns are fetched from the row's values, undefined attributes 
+        from the actual data object stored for this row."""
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            value = self._values[self._positions[name]]
+        except KeyError:
+            obj = self._dataset.meta._stored_objects.get_object(self._key)
+            return getattr(obj, name)
+        if isinstance(value, RefValue):
+            return value.__get__(self, self.__class__)
+        return value
+    
+    def __setattr__(self, name, value):
+        """Replaces the value of a column, new columns cannot be added"""
+        try:
+            pos = self._positions[name]
+        except KeyError:
+            raise AttributeError(
+                "%s has no column '%s' to set" % (self, name))
+        values = list(self._values)
+        values[pos] = value
+        object.__setattr__(self, '_values', tuple(values))
+    
+    @classmethod
+    def columns(self):
+        """Classmethod that yields all column names in the order the values 
+        are kept in: alphabetical for a DataSet with ``Meta.compact``, the 
+        order of ``columns`` for a :class:`ColumnarDataSet`."""
+        return iter(self._columns)
+
+def compact_row_class(dataset_class, columns):
+    """returns the :class:`CompactDataRow` subclass for rows of 
+    dataset_class with these columns (a tuple of names).
+    
+    Classes are created once and kept on dataset_class.
+    """
+    row_classes = dataset_class.__dict__.get('_compact_rows')
+    if row_classes is None:
+        row_classes = {}
+        dataset_class._compact_rows = row_classes
+    try:
+        return row_classes[columns]
+    except KeyError:
+        row_class = type("%sRow" % dataset_class.__name__, (CompactDataRow,), 
+                    {'__slots__': (), '_columns': columns, 
+                     '_positions': dict([(name, pos) for pos, name 
+                                                    in enumerate(columns)])})
+        row_classes[columns] = row_class
+        return row_class
+
+def raw_column_values(row):
+    """returns (name, value) pairs for the columns of a row or row class.
+    
+    Values are read from the class or from the values of a 
+    :class:`CompactDataRow` so that :class:`Ref.Value <RefValue>` 
+    descriptors are not resolved.
+    """
+    if isinstance(row, CompactDataRow):
+        return list(zip(row._columns, row._values))
+    if not isclass(row):
+        row = row.__class__
+    return [(name, getattr(row, name)) for name in row.columns()]
 
 class DataSetStore(list):
-    """keeps track of actual objects stored in a dataset."""
+    """keeps track of actual objects stored in a dataset.
+    
+    The primary keys of stored objects are kept once :meth:`primary_keys` 
+    has been called so that they are only computed once per object.
+    """
     def __init__(self, dataset):
         list.__init__(self)
         self.dataset = dataset
         self._ds_key_map = {}
+        self._keys = []
+        self._pks = []
+        self._pk_func = None
     
     def get_object(self, key):
         """returns the object at this key.
@@ -333,11 +569,33 @@ class DataSetStore(list):
                 etype("row '%s' hasn't been loaded for %s (loaded: %s)" % (
                     key, self.dataset, self)),
             )
+    
+    def keys(self):
+        """returns the keys of all stored objects in the order they were stored"""
+        return list(self._keys)
+    
+    def primary_keys(self, primary_key):
+        """returns the primary key of every stored object, in the order they 
+        were stored.
         
+        primary_key is a callable that returns the primary key of a stored 
+        object as a tuple (i.e. a storage medium's ``stored_object_key``).  
+        It is only called for objects stored since the last call, so 
+        primary keys should not be asked for before they are final, as they 
+        may not be for objects that were not flushed to a database yet.
+        """
+        if primary_key != self._pk_func:
+            self._pks = []
+            self._pk_func = primary_key
+        for pos in range(len(self._pks), len(self)):
+            self._pks.append(tuple(primary_key(self[pos])))
+        return list(self._pks)
+    
     def store(self, key, obj):
         self.append(obj)
         pos = len(self)-1
         self._ds_key_map[key] = pos
+        self._keys.append(key)
 
 dataset_registry = ObjRegistry()
 
@@ -362,6 +620,15 @@ class DataSetMeta(DataContainer.Meta):
     ``primary_key``
         this is a list of names that should be acknowledged as primary keys 
         in a ``DataSet``.  The default is simply ``['id']``.
+
+    ``compact``
+        if True, rows are kept as :class:`CompactDataRow` instances instead 
+        of creating a class for every row, which saves a lot of memory for 
+        DataSets with many rows.  ``row`` is not used in this case.
+
+    ``batch_size``
+        the most rows a batch loader saves at once.  The default, None, 
+        saves all rows of the ``DataSet`` together.
         
     Here is an example of using an inner ``Meta`` class to specify a custom 
     storable object to be used when storing a :class:`DataSet`::
@@ -381,6 +648,8 @@ class DataSetMeta(DataContainer.Meta):
         
     """
     row = DataRow
+    compact = False
+    batch_size = None
     storable = None
     storable_name = None
     storage_medium = None
@@ -388,6 +657,9 @@ class DataSetMeta(DataContainer.Meta):
     references = []
     _stored_objects = None
     _built = False
+    # (DataSet class, column) pairs the rows read with a Ref.Value, found 
+    # while the rows are built:
+    _columns_read = None
 
 
 class DataSet(with_metaclass(DataType, DataContainer)):
@@ -486,14 +758,25 @@ class DataSet(with_metaclass(DataType, DataContainer)):
         # data def style classes, so they have refs before data is walked
         if len(self.meta.references) > 0:
             self.ref = mkref()
-            
+        
+        self.meta._columns_read = set()
         for key, data in self.data():
             if key in self:
                 raise ValueError(
                     "data() cannot redeclare key '%s' "
                     "(this is already an attribute)" % key)
-                    
+            
             if isinstance(data, dict):
+                for value in data.values():
+                    if isinstance(value, Ref.Value):
+                        self.meta._columns_read.add(
+                            (value.ref.dataset_class, value.attr_name))
+            
+            if isinstance(data, dict) and self.meta.compact:
+                columns = tuple(sorted(data.keys()))
+                data = compact_row_class(self.__class__, columns)(
+                                    self, key, [data[c] for c in columns])
+            elif isinstance(data, dict):
                 # make a new class object for the row data
                 # so that a loaded dataset can instantiate this...
                 data = type(key, (self.meta.row,), data)
@@ -538,56 +821,21 @@ class DataSet(with_metaclass(DataType, DataContainer)):
             for k,v in self:
                 yield (k,v)
                 
-        def public_dir(obj):
-            for name in dir(obj):
-                if name.startswith("_"):
-                    continue
-                yield name
-        
-        def add_ref_from_rowlike(rowlike):
-            if rowlike._dataset not in self.meta.references:
-                self.meta.references.append(rowlike._dataset)
-                    
         empty = True
-        for name in public_dir(self.__class__):
-            val = getattr(self.__class__, name)
-            if not is_row_class(val):
-                continue
-            
+        for key, row_class, columns in self.__class__.current_schema():
             empty = False
-            key = name
-            row_class = val
             row = {}
-            
-            for col_name in public_dir(row_class):
-                col_val = getattr(row_class, col_name)
-                
-                if isinstance(col_val, Ref):
-                    # the .ref attribute
-                    continue
-                elif isinstance(col_val, (list, tuple, set)):
-                    for c in col_val:
-                        if is_rowlike(c):
-                            add_ref_from_rowlike(c)
-                        # NOP for Google Datastore (String)ListProperty
-                        # could definitely break any other storage mediums
-                        # ListProperty supports quite a few more types than these
-                        # see appengine.ext.db._ALLOWED_PROPERTY_TYPES
-                        elif isinstance(c, (string_types, bool, float, int)):
-                             continue
-                        else:
-                            raise TypeError(
-                                "multi-value columns can only contain "
-                                "rowlike objects, not %s of type %s" % (
-                                                col_val, type(col_val)))
-                elif is_rowlike(col_val):
-                    add_ref_from_rowlike(col_val)
-                elif isinstance(col_val, Ref.Value):
-                    ref = col_val.ref
-                    if ref.dataset_class not in self.meta.references:
+            for col_name, col_val, refs in columns:
+                value = getattr(row_class, col_name)
+                if value is not col_val or refs is None:
+                    # changed since the class was created (or invalid, in 
+                    # which case this raises the error)
+                    col_val = value
+                    refs = column_references(value)
+                for ref in refs:
+                    if ref not in self.meta.references:
                         # store the reference:
-                        self.meta.references.append(ref.dataset_class)
-                    
+                        self.meta.references.append(ref)
                 row[col_name] = col_val
             yield (key, row)
             
@@ -607,6 +855,133 @@ class DataSet(with_metaclass(DataType, DataContainer)):
             dataset_registry.register(dataset)
         return dataset
 
+class ColumnarDataSet(DataSet):
+    """
+    A DataSet declared as a table: column names and a sequence of row values
+
+    This is meant for large fixtures where declaring a class per row would
+    be slow and wasteful.  All rows share one :class:`CompactDataRow` class
+    and are loaded like the rows of any other DataSet::
+
+        >>> class CountryData(ColumnarDataSet):
+        ...     columns = ('code', 'name')
+        ...     rows = [
+        ...         ('fr', 'France'),
+        ...         ('nz', 'New Zealand'),
+        ...     ]
+        ...
+        >>> c = CountryData()
+        >>> c.nz.name
+        'New Zealand'
+
+    ``rows`` can be any iterable of sequences in the same order as
+    ``columns``, or a NumPy structured array, in which case ``columns``
+    defaults to the names of its fields.
+
+    The value of ``key_column`` (the first column if None) is the key of
+    each row.  The key column is stored along with the others unless
+    ``store_key`` is False, which is handy for a column that is only a label.
+
+    Other DataSets reference a row with :meth:`row`, which works like
+    the inner class of a regular DataSet::
+
+        >>> class CityData(DataSet):
+        ...     class wellington:
+        ...         country = CountryData.row('nz')
+        ...         country_code = CountryData.row('nz').ref('code')
+        ...
+
+    Values in ``rows`` may also be rowlike objects or :class:`Ref.Value
+    <RefValue>` instances that point to other DataSets.
+    """
+    _reserved_attr = DataSet._reserved_attr + (
+                                'columns', 'rows', 'key_column', 'store_key', 'row')
+    columns = ()
+    rows = ()
+    key_column = None
+    store_key = True
+
+    @classmethod
+    def row(cls, key):
+        """Returns a rowlike class for the row at key.
+
+        The class can be assigned to a column of another DataSet and
+        has a ``ref`` attribute just like the row classes of a
+        regular DataSet.  One class is created per referenced key.
+        Keys are converted to strings like the values of the key column,
+        so ``row(1)`` is the row with the key ``'1'``.
+        """
+        key = str(key)
+        stubs = cls.__dict__.get('_row_stubs')
+        if stubs is None:
+            stubs = {}
+            cls._row_stubs = stubs
+        try:
+            return stubs[key]
+        except KeyError:
+            stub = type(key, (object,), {'_dataset': cls})
+            stub.ref = Ref(cls, stub)
+            stubs[key] = stub
+            return stub
+
+    def data(self):
+        """yields key/:class:`CompactDataRow` pairs built from ``rows``"""
+        if self.meta._built:
+            for k,v in self:
+                yield (k,v)
+
+        rows = self.rows
+        columns = tuple(self.columns)
+        if hasattr(rows, 'dtype') and hasattr(rows, 'tolist'):
+            # a NumPy structured array, make native values out of its records
+            if not columns:
+                columns = tuple(rows.dtype.names)
+            rows = rows.tolist()
+
+        empty = True
+        for key, row in self._rows_from_values(columns, rows):
+            empty = False
+            yield (key, row)
+
+        if empty:
+            raise ValueError("cannot create an empty DataSet")
+        self.meta._built = True
+
+    def _rows_from_values(self, columns, rows):
+        """yields key/:class:`CompactDataRow` pairs for rows of values in 
+        the order of columns."""
+        if not columns:
+            raise ValueError(
+                "%s must declare its columns" % self.__class__.__name__)
+        columns = tuple(columns)
+        if self.key_column is None:
+            key_pos = 0
+        else:
+            key_pos = columns.index(self.key_column)
+        positions = [pos for pos in range(len(columns))
+                                    if self.store_key or pos != key_pos]
+        row_class = compact_row_class(self.__class__,
+                                      tuple([columns[pos] for pos in positions]))
+        simple_types = string_types + (bool, float, int, type(None))
+
+        for values in rows:
+            if len(values) != len(columns):
+                raise ValueError(
+                    "row %r of %s does not match columns %s" % (
+                        values, self.__class__.__name__, columns))
+            row = [values[pos] for pos in positions]
+            for value in row:
+                if isinstance(value, simple_types):
+                    continue
+                if isinstance(value, Ref.Value):
+                    self.meta._columns_read.add(
+                        (value.ref.dataset_class, value.attr_name))
+                for ref in column_references(value):
+                    if ref not in self.meta.references:
+                        self.meta.references.append(ref)
+            key = str(values[key_pos])
+            yield (key, row_class(self, key, row))
+
 class DataSetContainer(object):
     """
     A ``DataSet`` of :class:`DataSet` classes
@@ -747,7 +1122,7 @@ class MergedSuperSet(SuperSet):
                             k, dataset, self.meta.keys_to_datasets[k]))
                 
                 # need an instance here, if it's a class...
-                if not isinstance(row, DataRow):
+                if isclass(row):
                     row = row(dataset)
                 self._setdata(k, row)
                 self.meta.keys_to_datasets[k] = dataset 
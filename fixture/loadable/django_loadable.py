@@ -5,13 +5,19 @@ See :ref:`Using Fixture With Django <using-fixture-with-django>` for a
 complete example.
 """
 
+import sys
+from timeit import default_timer
+
+from six import reraise
+
 try:
     from django.apps.registry import apps
 except ImportError:
     pass
 
+from fixture.exc import UnloadError
 from fixture.loadable import DBLoadableFixture
-from fixture.loadable.loadable import EnvLoadableFixture
+from fixture.loadable.loadable import EnvLoadableFixture, chunks
 from fixture.util import any
 
 
@@ -41,9 +47,57 @@ def field_is_required(field):
     return not any(fields)
 
 
+def can_return_bulk_pks(connection):
+    """Does bulk_create set the primary keys of new objects on this
+    connection
+
+    This is only the case for PostgreSQL, from Django 1.10 on.
+    """
+    return getattr(connection.features, 'can_return_ids_from_bulk_insert',
+                   False)
+
+
+class ModelSchema(object):
+    """The fields of a django model that :class:`DjangoMedium` checks rows
+    against.
+
+    Use :meth:`for_model` to get the schema of a model, it is only built once
+    per model and shared by all fixtures.  ``checked_shapes`` holds the
+    tuples of column names that passed the checks that don't depend on
+    column values.
+    """
+    _schemas = {}
+
+    def __init__(self, model):
+        fields = model._meta.fields
+        self.model = model
+        # This will be only localy defined fields (excluding many_to_many)
+        self.field_names = frozenset([f.name for f in fields])
+        # All locally defined fields which are required and not auto fields
+        self.required_field_names = frozenset([f.name for f in fields
+                                               if field_is_required(f)])
+        self.m2m_fields = dict([(f.name, f)
+                                for f in model._meta.many_to_many])
+        self.m2m_field_names = frozenset(self.m2m_fields)
+        self.all_field_names = self.field_names.union(self.m2m_field_names)
+        self.checked_shapes = set()
+
+    @classmethod
+    def for_model(cls, model):
+        """Returns the schema of this model"""
+        try:
+            return cls._schemas[model]
+        except KeyError:
+            schema = cls._schemas[model] = cls(model)
+            return schema
+
+
 class DjangoMedium(DBLoadableFixture.StorageMediumAdapter):
     """Adapter for storing data using django models
     """
+    bulk_create = False
+    # the most primary keys to put in one statement
+    chunk_size = 500
 
     def clear(self, obj):
         """Delete this object from the DB
@@ -53,6 +107,43 @@ class DjangoMedium(DBLoadableFixture.StorageMediumAdapter):
         """
         obj.delete()
 
+    def clearall_bulk(self, raw=False):
+        """Delete all stored objects with one ``filter(pk__in=...).delete()``
+        for every ``chunk_size`` primary keys
+
+        :param raw: If True, delete the rows with a single ``DELETE``
+            statement without collecting related objects or sending
+            signals.  Links of the model's own many to many fields are
+            deleted the same way first, anything else referencing the rows
+            must already be gone.  This relies on the private
+            ``QuerySet._raw_delete()``, which is only verified against
+            Django 1.8 to 1.11.
+        """
+        model = self.medium
+        keys = self.dataset.meta._stored_objects.primary_keys(
+            self.stored_object_key)
+        pks = [key[0] for key in keys]
+        manager = model._base_manager
+        try:
+            for chunk in chunks(pks, self.chunk_size):
+                if not raw:
+                    manager.filter(pk__in=chunk).delete()
+                    continue
+                for field in ModelSchema.for_model(model).m2m_fields.values():
+                    through = field.rel.through
+                    links = through._base_manager.filter(**{
+                        '%s__in' % field.m2m_field_name(): chunk})
+                    links._raw_delete(links.db)
+                rows = manager.filter(pk__in=chunk)
+                rows._raw_delete(rows.db)
+        except Exception:
+            etype, val, tb = sys.exc_info()
+            reraise(UnloadError, UnloadError(etype, val, self.dataset))
+
+    def stored_object_key(self, obj):
+        """Returns the primary key of a stored object as a tuple"""
+        return (obj.pk,)
+
     def _annotate_invalid_schema_exception(self, model, key):
         """Try and add more context to any error message"""
         info = ""
@@ -88,40 +179,40 @@ class DjangoMedium(DBLoadableFixture.StorageMediumAdapter):
     def _check_schema(self, column_vals):
         """Check that the column_vals given match up to this model's schema
 
+        Field names are only checked the first time a combination of them
+        is seen for the model, many to many values are checked for every row.
+
         :param column_vals: The parsed column values
         :type column_vals: tuple of field_name, field_value
         :raises: ValueError
         """
 
         model = self.medium
-        # This will be only localy defined fields (excluding many_to_many)
-        own_field_names = set([f.name for f in model._meta.fields])
-        # All locally defined fields which are required and not auto fields (id)
-        required_field_names = set([f.name for f in model._meta.fields
-                                    if field_is_required(f)])
-        m2m_field_names = set([f.name for f in model._meta.many_to_many])
+        schema = ModelSchema.for_model(model)
+        column_vals = list(column_vals)
+        shape = tuple([key for key, val in column_vals])
+        if shape not in schema.checked_shapes:
+            for key in shape:
+                # Valid field?
+                if not key in schema.all_field_names:
+                    msg = "Model %r doesn't have field named %s." % \
+                          (pretty_model_name(model), key)
+
+                    raise ValueError(
+                        msg + self._annotate_invalid_schema_exception(model,
+                                                                      key))
+            required_field_names = set(
+                schema.required_field_names.difference(shape))
+            if len(required_field_names):
+                raise ValueError("Requred fields %s not found" %
+                                 required_field_names)
+            schema.checked_shapes.add(shape)
 
         processed_column_values = []
         for key, val in column_vals:
-            # Valid field?
-            if not key in own_field_names.union(m2m_field_names):
-                msg = "Model %r doesn't have field named %s." % \
-                      (pretty_model_name(model), key)
-
-                raise ValueError(msg +
-                                 self._annotate_invalid_schema_exception(model,
-                                                                         key))
-
-            # Keep a track of required fields
-            try:
-                required_field_names.remove(key)
-            except KeyError:
-                pass
-
             # If the field is a relation check the related type
-            field = model._meta.get_field(key)
-            from django.db.models.fields.related import ManyToManyField
-            if isinstance(field, ManyToManyField):
+            field = schema.m2m_fields.get(key)
+            if field is not None:
                 try:
                     len(val)
                 except TypeError:
@@ -134,17 +225,12 @@ class DjangoMedium(DBLoadableFixture.StorageMediumAdapter):
                                       pretty_model_name(field.rel.to),
                                       val))
             processed_column_values.append((key, val))
-        if len(required_field_names):
-            raise ValueError("Requred fields %s not found" %
-                             required_field_names)
-        return m2m_field_names, processed_column_values
+        return schema.m2m_field_names, processed_column_values
 
     def save(self, row, column_vals):
         """Save this row to the DB"""
-        model = self.medium
         manager = self.medium._default_manager
-        field_names = [f.name for f in model._meta.fields]
-        # column_vals = list(column_vals)
+        field_names = ModelSchema.for_model(self.medium).field_names
         m2m_field_names, column_vals = self._check_schema(column_vals)
         # This will take care of foreignkeys too
         dbvals = {}
@@ -158,13 +244,117 @@ class DjangoMedium(DBLoadableFixture.StorageMediumAdapter):
                 getattr(new_obj, m2m).add(*columns[m2m])
         return new_obj
 
+    def save_batch(self, batch):
+        """Save a batch of rows to the DB
+
+        When the loader was created with ``bulk_create=True`` all rows are
+        inserted with one ``bulk_create`` and the links of each many to many
+        field with one ``bulk_create`` of its ``through`` model.  If the
+        backend can't return the primary keys of a bulk insert and some rows
+        don't declare theirs, each object is saved on its own instead.
+        Otherwise every row is saved with :meth:`save`.
+        """
+        if not self.bulk_create:
+            return DBLoadableFixture.StorageMediumAdapter.save_batch(
+                self, batch)
+        from django.db import connections, router
+        model = self.medium
+        manager = model._default_manager
+        schema = ModelSchema.for_model(model)
+        field_names = schema.field_names
+        objects = []
+        links = []
+        for row, column_vals in batch:
+            m2m_field_names, column_vals = self._check_schema(column_vals)
+            new_obj = model(**dict([(key, val) for key, val in column_vals
+                                    if key in field_names]))
+            objects.append(new_obj)
+            links.extend([(new_obj, key, val) for key, val in column_vals
+                          if key in m2m_field_names])
+
+        connection = connections[router.db_for_write(model)]
+        if (can_return_bulk_pks(connection) or
+                not [obj for obj in objects if obj.pk is None]):
+            manager.bulk_create(objects)
+        else:
+            for new_obj in objects:
+                new_obj.save(force_insert=True)
+
+        through_objects = {}
+        for new_obj, key, val in links:
+            field = schema.m2m_fields[key]
+            through = field.rel.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            through_objects.setdefault(through, []).extend(
+                [through(**{source: new_obj, target: other})
+                 for other in val])
+        for through, through_rows in through_objects.items():
+            through._default_manager.bulk_create(through_rows)
+        return objects
+
     def visit_loader(self, loader):
         """Let Django TestCase take care of transactions itself."""
-        pass
+        self.bulk_create = getattr(loader, 'bulk_create', False)
 
 
 class DjangoFixture(EnvLoadableFixture):
+    """Loads DataSet objects with Django models
+
+    Keyword Arguments:
+
+    ``bulk_create``
+        If True, loading is done in batch mode and the rows of each DataSet
+        are inserted with the model manager's ``bulk_create`` instead of one
+        ``get_or_create`` per row, see :meth:`DjangoMedium.save_batch`.
+        Rows that already exist are not looked up and the model's ``save()``
+        and its signals may be skipped.
+        This targets the model API of Django 1.8 to 1.11 (``field.rel``);
+        primary keys of new rows are only returned by ``bulk_create`` on
+        PostgreSQL with Django 1.10 or later, elsewhere rows without a
+        declared ``id`` are saved one at a time.
+
+    ``unload_strategy``
+        How stored objects are deleted at teardown.  By default
+        ``delete()`` is called on each of them.  The other choices are:
+
+        ``'delete'``
+            delete the objects of each DataSet with one
+            ``filter(pk__in=...).delete()`` per model, which still cascades
+            and sends signals
+        ``'raw'``
+            delete the rows of each DataSet with one ``DELETE`` statement per
+            table, without cascading or sending signals, see
+            :meth:`DjangoMedium.clearall_bulk`.  This uses Django's private
+            ``QuerySet._raw_delete()`` and is verified against Django 1.8
+            to 1.11 only
+
+        Either way DataSet objects are unloaded in the same order that their
+        objects would be deleted in.
+    """
     Medium = DjangoMedium
+    unload_strategies = (None, 'delete', 'raw')
+
+    def __init__(self, bulk_create=False, unload_strategy=None, **kw):
+        if bulk_create:
+            kw.setdefault('batch', True)
+        EnvLoadableFixture.__init__(self, **kw)
+        self.bulk_create = bulk_create
+        if unload_strategy not in self.unload_strategies:
+            raise ValueError(
+                "unload_strategy must be one of %s, not %r" % (
+                    self.unload_strategies, unload_strategy))
+        self.unload_strategy = unload_strategy
+
+    def unload_datasets(self, datasets):
+        """Unload datasets according to ``unload_strategy``"""
+        if self.unload_strategy is None:
+            return EnvLoadableFixture.unload_datasets(self, datasets)
+        for dataset in datasets:
+            started = default_timer()
+            dataset.meta.storage_medium.clearall_bulk(
+                raw=self.unload_strategy == 'raw')
+            self.count_unload(dataset, started)
 
     def attach_storage_medium(self, ds):
         model_identifier = getattr(ds.meta, 'django_model', None)
@@ -190,11 +380,15 @@ class DjangoFixture(EnvLoadableFixture):
             return model
 
     def wrap_in_transaction(self, routine, unloading=False):
-        self.begin(unloading=unloading)
+        self.start_timing(unloading=unloading)
         try:
-            routine()
+            self.begin(unloading=unloading)
+            try:
+                routine()
+            finally:
+                self.then_finally(unloading=unloading)
         finally:
-            self.then_finally(unloading=unloading)
+            self.stop_timing()
 
 
 class DjangoEnv(object):
@@ -5,14 +5,18 @@ See :ref:`Using LoadableFixture<using-loadable-fixture>` for examples.
 
 """
 # from __future__ import with_statement
-__all__ = ['LoadableFixture', 'EnvLoadableFixture', 'DBLoadableFixture', 'DeferredStoredObject']
+__all__ = ['LoadableFixture', 'EnvLoadableFixture', 'DBLoadableFixture', 'DeferredStoredObject',
+           'LoadReport']
 import sys
 import types
+from inspect import isclass
+from timeit import default_timer
 
 from six import reraise
 
 from fixture.base import Fixture
-from fixture.dataset import Ref, dataset_registry, DataRow, is_rowlike
+from fixture.dataset import (
+    Ref, dataset_registry, DataRow, is_rowlike, raw_column_values)
 from fixture.exc import UninitializedError, LoadError, UnloadError, StorageMediaNotFound
 from fixture.style import OriginalStyle
 from fixture.util import ObjRegistry, _mklog
@@ -28,6 +32,7 @@ class StorageMediumAdapter(object):
         self.medium = medium
         self.dataset = dataset
         self.transaction = None
+        self.clear_calls = 0
     
     def __getattr__(self, name):
         return getattr(self.obj, name)
@@ -48,6 +53,7 @@ class StorageMediumAdapter(object):
         for obj in self.dataset.meta._stored_objects:
             try:
                 self.clear(obj)
+                self.clear_calls += 1
             except Exception:
                 etype, val, tb = sys.exc_info()
                 reraise(
@@ -61,6 +67,19 @@ class StorageMediumAdapter(object):
         column_vals is an iterable of (column_name, column_value)
         """
         raise NotImplementedError
+    
+    def save_batch(self, batch):
+        """Given a list of (row, column_vals) pairs, must save all of them 
+        and return a list of stored objects in the same order.
+        
+        column_vals is a list of (column_name, column_value)
+        
+        This is only called when the loader is in batch mode.  By default 
+        each pair is passed to :meth:`save` one at a time.  A medium that can 
+        store many rows at once (i.e. with an executemany statement) should 
+        override this.
+        """
+        return [self.save(row, column_vals) for row, column_vals in batch]
         
     def visit_loader(self, loader):
         """A chance to visit the LoadableFixture object.
@@ -140,7 +159,255 @@ class LoadQueue(ObjRegistry):
                 yield obj
             
             treelog.info("%s. %s", level, verbose_obj)
+    
+    def to_load(self):
+        """yields (level, object) pairs in an order suitable for loading.
+        
+        This is the reverse of :meth:`to_unload`
+        """
+        for level in sorted(self.tree.keys(), reverse=True):
+            for id in self.tree[level]:
+                yield level, self.registry[id]
             
+class LoadPlan(object):
+    """The order to load a graph of DataSet objects in.
+    
+    The graph of references is walked once, depth first, so that every 
+    DataSet class comes after all the DataSet classes it references.  Each 
+    class is also given the highest level it can be reached at, starting 
+    from 1 for the roots, which is the level :class:`LoadQueue` expects it 
+    to be loaded at.
+    
+    Iterating yields (DataSet class, level) pairs in load order.
+    
+    ``columns_read`` maps each DataSet class to the set of 
+    (DataSet class, column) pairs its rows read with a :class:`Ref.Value 
+    <fixture.dataset.dataset.RefValue>`, i.e. ``category_id = CategoryData.cars.ref('id')`` 
+    reads ``(CategoryData, 'id')``.  Those columns must be known by the time 
+    the DataSet is loaded.  The pairs are collected while each DataSet 
+    builds its rows, so no rows are read to make a plan.  A DataSet that 
+    reads its rows from a file reads ``(DataSet class, None)``, meaning any 
+    column, for each of its ``Meta.references``.
+    """
+    
+    def __init__(self, datasets, default_refclass=None):
+        self.roots = tuple([ds.__class__ for ds in datasets])
+        self.order = []
+        self.levels = {}
+        self.references = references = {}
+        self.columns_read = {}
+        
+        def visit(ds):
+            ds_class = ds.__class__
+            if ds_class in references:
+                return
+            references[ds_class] = list(ds.meta.references)
+            self.columns_read[ds_class] = set(ds.meta._columns_read or ())
+            for ref_ds in references[ds_class]:
+                visit(ref_ds.shared_instance(default_refclass=default_refclass))
+            self.order.append(ds_class)
+        for ds in datasets:
+            visit(ds)
+        
+        # parents always come after their children so walking backwards 
+        # pushes each level down the graph before it is read :
+        for ds_class in self.roots:
+            self.levels[ds_class] = 1
+        for ds_class in reversed(self.order):
+            for ref_class in references[ds_class]:
+                self.levels[ref_class] = max(self.levels.get(ref_class, 0), 
+                                             self.levels[ds_class] + 1)
+    
+    def __repr__(self):
+        return "<%s %s at %s>" % (self.__class__.__name__, 
+                    [c.__name__ for c in self.order], hex(id(self)))
+    
+    def __iter__(self):
+        for ds_class in self.order:
+            yield ds_class, self.levels[ds_class]
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def stages(self):
+        """returns lists of (DataSet class, level) pairs in load order.
+        
+        DataSet classes in the same list do not depend on each other, only on 
+        DataSet classes of earlier lists, so they can be loaded in any order 
+        or all at once.
+        """
+        depth = {}
+        stages = []
+        for ds_class in self.order:
+            depth[ds_class] = max([0] + [depth.get(ref_class, -1) + 1 
+                                for ref_class in self.references[ds_class]])
+            while len(stages) <= depth[ds_class]:
+                stages.append([])
+            stages[depth[ds_class]].append(
+                                    (ds_class, self.levels[ds_class]))
+        return stages
+
+def chunks(seq, size):
+    """Returns seq split into lists of at most size items"""
+    return [seq[i:i+size] for i in range(0, len(seq), size)]
+
+class DataSetTiming(object):
+    """Time spent loading and unloading one DataSet class.
+    
+    Counts how many times it was loaded and unloaded, how many rows were 
+    saved, and how many calls were made to the storage medium's save() 
+    (or save_batch()) and clear()
+    """
+    def __init__(self, dataset_class):
+        self.dataset_class = dataset_class
+        self.loads = 0
+        self.unloads = 0
+        self.load_time = 0.0
+        self.unload_time = 0.0
+        self.rows = 0
+        self.save_calls = 0
+        self.clear_calls = 0
+    
+    def __repr__(self):
+        return "<%s for %s: %.4fs load, %.4fs unload, %s rows>" % (
+                self.__class__.__name__, self.dataset_class.__name__, 
+                self.load_time, self.unload_time, self.rows)
+    
+    @property
+    def total_time(self):
+        """time spent loading and unloading"""
+        return self.load_time + self.unload_time
+    
+    def add(self, other):
+        """add the time and counts of another DataSetTiming"""
+        for name in ('loads', 'unloads', 'load_time', 'unload_time', 'rows', 
+                     'save_calls', 'clear_calls'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+class LoadTiming(object):
+    """Time spent in one load or unload.
+    
+    ``wall_time`` is the time from begin to the end of commit or rollback, 
+    ``resolve_time`` is the time spent resolving row references, 
+    ``flushes`` counts how many times the loader flushed pending rows 
+    before loading DataSet objects that read their columns and 
+    ``datasets`` holds a :class:`DataSetTiming` for every DataSet class 
+    that was loaded or unloaded.
+    """
+    def __init__(self, unloading=False):
+        self.unloading = unloading
+        self.started = default_timer()
+        self.wall_time = 0.0
+        self.resolve_time = 0.0
+        self.commit_time = 0.0
+        self.rollback_time = 0.0
+        self.flushes = 0
+        self.datasets = {}
+    
+    def __repr__(self):
+        return "<%s %s of %s DataSets in %.4fs>" % (
+                self.__class__.__name__, 
+                (self.unloading and "unload" or "load"), 
+                len(self.datasets), self.wall_time)
+    
+    def add(self, other):
+        """add the time spent in another LoadTiming, except for wall time"""
+        for name in ('resolve_time', 'commit_time', 'rollback_time', 
+                     'flushes'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for ds_class, timing in other.datasets.items():
+            self.dataset(ds_class).add(timing)
+    
+    def dataset(self, dataset_class):
+        """returns the :class:`DataSetTiming` for this DataSet class"""
+        try:
+            return self.datasets[dataset_class]
+        except KeyError:
+            timing = self.datasets[dataset_class] = DataSetTiming(dataset_class)
+            return timing
+    
+    def stop(self):
+        """stop the clock"""
+        self.wall_time = default_timer() - self.started
+
+class LoadReport(object):
+    """Collects a :class:`LoadTiming` for every load and unload of the 
+    :class:`LoadableFixture` objects it was given to.
+    
+    One report can be shared by all fixtures of a test run::
+    
+        >>> from fixture.loadable.loadable import LoadReport
+        >>> report = LoadReport()
+        >>> db = SQLAlchemyFixture(env=..., engine=..., report=report) # doctest: +SKIP
+        
+    and printed at the end to show the DataSet classes that took the most 
+    time::
+    
+        >>> print(report.format(count=3)) # doctest: +SKIP
+    
+    """
+    def __init__(self):
+        self.timings = []
+    
+    def __repr__(self):
+        return "<%s of %s loads and unloads in %.4fs>" % (
+                self.__class__.__name__, len(self.timings), self.wall_time)
+    
+    def __str__(self):
+        return self.format()
+    
+    @property
+    def wall_time(self):
+        """total time of all loads and unloads"""
+        return sum([t.wall_time for t in self.timings])
+    
+    def start(self, unloading=False):
+        """returns a new :class:`LoadTiming` that is part of this report"""
+        timing = LoadTiming(unloading=unloading)
+        self.timings.append(timing)
+        return timing
+    
+    def datasets(self):
+        """returns a dict of DataSet class to a :class:`DataSetTiming` 
+        that adds up all loads and unloads"""
+        totals = {}
+        for timing in self.timings:
+            for ds_class, ds_timing in timing.datasets.items():
+                if ds_class not in totals:
+                    totals[ds_class] = DataSetTiming(ds_class)
+                totals[ds_class].add(ds_timing)
+        return totals
+    
+    def slowest(self, count=10):
+        """returns a :class:`DataSetTiming` for the count DataSet classes 
+        that took the most time, slowest first"""
+        totals = sorted(self.datasets().values(), 
+                        key=lambda t: t.total_time, reverse=True)
+        return totals[:count]
+    
+    def format(self, count=10):
+        """returns a table of the count slowest DataSet classes"""
+        lines = ["%-40s %10s %10s %8s %8s %8s" % (
+                    "DataSet", "load (s)", "unload (s)", "rows", "saves", 
+                    "clears")]
+        for t in self.slowest(count=count):
+            lines.append("%-40s %10.4f %10.4f %8s %8s %8s" % (
+                    t.dataset_class.__name__, t.load_time, t.unload_time, 
+                    t.rows, t.save_calls, t.clear_calls))
+        loads = [t for t in self.timings if not t.unloading]
+        unloads = [t for t in self.timings if t.unloading]
+        for label, timings in (("loads", loads), ("unloads", unloads)):
+            lines.append(
+                "%s %s: %.4fs wall, %.4fs resolving references, "
+                "%.4fs commit, %.4fs rollback, %s flushes" % (
+                    len(timings), label, 
+                    sum([t.wall_time for t in timings]), 
+                    sum([t.resolve_time for t in timings]), 
+                    sum([t.commit_time for t in timings]), 
+                    sum([t.rollback_time for t in timings]), 
+                    sum([t.flushes for t in timings])))
+        return "\n".join(lines)
+
 class LoadableFixture(Fixture):
     """
     knows how to load data into something useful.
@@ -159,23 +426,41 @@ class LoadableFixture(Fixture):
     medium
         optional LoadableFixture.StorageMediumAdapter to store DataSet 
         objects with
+    batch
+        when True, the rows of each DataSet are handed to 
+        :meth:`StorageMediumAdapter.save_batch` together instead of one at a 
+        time.  A row that references another row in its own DataSet starts 
+        a new batch so that the referenced row is saved first.
+    report
+        a :class:`LoadReport` to record the time spent in every load and 
+        unload in.  Nothing is timed by default.
     
     """
     style = OriginalStyle()
     dataclass = Fixture.dataclass
+    batch = False
+    report = None
     
-    def __init__(self, style=None, medium=None, **kw):
+    def __init__(self, style=None, medium=None, batch=False, report=None, 
+                                                                    **kw):
         Fixture.__init__(self, loader=self, **kw)
         if style:
             self.style = style
         if medium:
             self.Medium = medium
+        if batch:
+            self.batch = batch
+        if report is not None:
+            self.report = report
         self.loaded = None
+        self.load_plans = {}
+        self.timing = None
     
     StorageMediumAdapter = StorageMediumAdapter
     Medium = StorageMediumAdapter
     StorageMediaNotFound = StorageMediaNotFound
     LoadQueue = LoadQueue
+    LoadPlan = LoadPlan
     
     def attach_storage_medium(self, ds):
         """attach a :class:`StorageMediumAdapter` to DataSet"""
@@ -192,11 +477,41 @@ class LoadableFixture(Fixture):
     
     def load(self, data):
         """load data"""
+        datasets = [ds for ds in data]
+        plan = self.plan_load(datasets)
         def loader():
-            for ds in data:
-                self.load_dataset(ds)
+            self.load_planned(plan, datasets)
         self.wrap_in_transaction(loader, unloading=False)
+    
+    def plan_load(self, datasets):
+        """returns the :class:`LoadPlan` for these root datasets.
+        
+        Plans are built once per tuple of DataSet classes and reused for 
+        every load after that.
+        """
+        key = tuple([ds.__class__ for ds in datasets])
+        try:
+            return self.load_plans[key]
+        except KeyError:
+            plan = self.LoadPlan(datasets, default_refclass=self.dataclass)
+            self.load_plans[key] = plan
+            return plan
+    
+    def load_planned(self, plan, datasets, level=1):
+        """load all datasets in plan.
         
+        datasets are the plan's roots, any other DataSet in the plan is 
+        loaded as its shared instance.  level is the level of the roots.
+        """
+        roots = {}
+        for ds in datasets:
+            roots.setdefault(ds.__class__, ds)
+        for ds_class, ds_level in plan:
+            ds = roots.get(ds_class)
+            if ds is None:
+                ds = ds_class.shared_instance(default_refclass=self.dataclass)
+            self.load_rows(ds, ds_level + level - 1)
+    
     def load_dataset(self, ds, level=1):
         """load this dataset and all its dependent datasets.
         
@@ -206,6 +521,13 @@ class LoadableFixture(Fixture):
         dependencies : 0 is the bottom, and thus should be the first set of 
         objects unloaded
         
+        """
+        self.load_planned(self.plan_load([ds]), [ds], level=level)
+    
+    def load_rows(self, ds, level):
+        """load the rows of this dataset only.
+        
+        All datasets it references must already be loaded.
         """
         is_parent = level==1
         
@@ -214,11 +536,6 @@ class LoadableFixture(Fixture):
             "%s%s%s (%s)", level * '  ', levsep, ds.__class__.__name__, 
                                             (is_parent and "parent" or level))
         
-        for ref_ds in ds.meta.references:
-            r = ref_ds.shared_instance(default_refclass=self.dataclass)
-            new_level = level+1
-            self.load_dataset(r,  level=new_level)
-        
         self.attach_storage_medium(ds)
         
         if ds in self.loaded:
@@ -227,17 +544,33 @@ class LoadableFixture(Fixture):
             return
         
         log.info("LOADING rows in %s", ds)
-        ds.meta.storage_medium.visit_loader(self)
+        started = default_timer()
+        try:
+            ds.meta.storage_medium.visit_loader(self)
+            if self.batch:
+                self.load_rows_in_batch(ds, level)
+            else:
+                self.load_rows_one_by_one(ds, level)
+        finally:
+            if self.timing is not None:
+                ds_timing = self.timing.dataset(ds.__class__)
+                ds_timing.loads += 1
+                ds_timing.load_time += default_timer() - started
+    
+    def load_rows_one_by_one(self, ds, level):
+        """save the rows of this dataset using 
+        :meth:`StorageMediumAdapter.save`, one row at a time."""
         registered = False
         for key, row in ds:
             try:
                 self.resolve_row_references(ds, row)
-                if not isinstance(row, DataRow):
+                if isclass(row):
                     row = row(ds)
                 def column_vals():
                     for c in row.columns():
                         yield (c, self.resolve_stored_object(getattr(row, c)))
                 obj = ds.meta.storage_medium.save(row, column_vals())
+                self.count_saves(ds, 1)
                 ds.meta._stored_objects.store(key, obj)
                 # save the instance in place of the class...
                 ds._setdata(key, row)
@@ -249,9 +582,67 @@ class LoadableFixture(Fixture):
                 etype, val, tb = sys.exc_info()
                 reraise(LoadError, LoadError(etype, val, ds, key=key, row=row))
     
+    def load_rows_in_batch(self, ds, level):
+        """save the rows of this dataset using 
+        :meth:`StorageMediumAdapter.save_batch`.
+        
+        Rows are collected until one of them references a row of the same 
+        dataset.  At that point the collected rows are saved so that the 
+        reference can be resolved, then collecting starts over.  No more 
+        than ``ds.meta.batch_size`` rows are collected, if it is set.
+        """
+        pending = []
+        class state:
+            registered = False
+        
+        def save_pending():
+            if not pending:
+                return
+            try:
+                stored = ds.meta.storage_medium.save_batch(
+                                [(row, vals) for key, row, vals in pending])
+            except Exception:
+                etype, val, tb = sys.exc_info()
+                reraise(LoadError, LoadError(etype, val, ds, 
+                            key=", ".join([key for key, row, vals in pending])))
+            self.count_saves(ds, len(pending))
+            for (key, row, vals), obj in zip(pending, stored):
+                ds.meta._stored_objects.store(key, obj)
+                # save the instance in place of the class...
+                ds._setdata(key, row)
+            if not state.registered:
+                self.loaded.register(ds, level)
+                state.registered = True
+            del pending[:]
+        
+        for key, row in ds:
+            if row_references_dataset(row, type(ds)):
+                save_pending()
+            try:
+                self.resolve_row_references(ds, row)
+                if isclass(row):
+                    row = row(ds)
+                vals = [(c, self.resolve_stored_object(getattr(row, c))) 
+                                                    for c in row.columns()]
+            except Exception:
+                etype, val, tb = sys.exc_info()
+                reraise(LoadError, LoadError(etype, val, ds, key=key, row=row))
+            pending.append((key, row, vals))
+            if len(pending) == ds.meta.batch_size:
+                save_pending()
+        save_pending()
+    
+    def count_saves(self, ds, rows):
+        """count one call to the storage medium that saved rows of ds"""
+        if self.timing is not None:
+            ds_timing = self.timing.dataset(ds.__class__)
+            ds_timing.rows += rows
+            ds_timing.save_calls += 1
+    
     def resolve_row_references(self, current_dataset, row):        
         """resolve this DataRow object's referenced values.
         """
+        started = default_timer()
         def resolved_rowlike(rowlike):
             key = rowlike.__name__
             if rowlike._dataset is type(current_dataset):
@@ -267,8 +658,7 @@ class LoadableFixture(Fixture):
                 # parent organization)
                 return candidate
                 
-        for name in row.columns():
-            val = getattr(row, name)
+        for name, val in raw_column_values(row):
             if isinstance(val, (list, tuple)):
                 # i.e. categories = [python, ruby]
                 setattr(row, name, list(map(resolve_stored_object, val)))
@@ -284,6 +674,8 @@ class LoadableFixture(Fixture):
                 # now the ref will return the attribute from a stored object 
                 # when __get__ is invoked
                 ref.dataset_obj = self.loaded[ref.dataset_class]
+        if self.timing is not None:
+            self.timing.resolve_time += default_timer() - started
     
     def rollback(self):
         """rollback load transaction"""
@@ -300,29 +692,75 @@ class LoadableFixture(Fixture):
                 "Cannot unload data because it has not yet been loaded in this "
                 "process.  Call data.setup() before data.teardown()")
         def unloader():
-            for dataset in self.loaded.to_unload():
-                self.unload_dataset(dataset)
+            self.unload_datasets(self.loaded.to_unload())
             self.loaded.clear()
             dataset_registry.clear()
         self.wrap_in_transaction(unloader, unloading=True)
     
+    def unload_datasets(self, datasets):
+        """unload data stored for these datasets, given in unload order"""
+        for dataset in datasets:
+            self.unload_dataset(dataset)
+    
     def unload_dataset(self, dataset):
         """unload data stored for this dataset"""
-        dataset.meta.storage_medium.clearall()
+        medium = dataset.meta.storage_medium
+        started = default_timer()
+        clear_calls = medium.clear_calls
+        try:
+            medium.clearall()
+        finally:
+            self.count_unload(dataset, started, 
+                              clear_calls=medium.clear_calls - clear_calls)
+    
+    def count_unload(self, dataset, started, clear_calls=0):
+        """count the unloading of dataset that began at started"""
+        if self.timing is not None:
+            ds_timing = self.timing.dataset(dataset.__class__)
+            ds_timing.unloads += 1
+            ds_timing.unload_time += default_timer() - started
+            ds_timing.clear_calls += clear_calls
+    
+    def start_timing(self, unloading=False):
+        """start a :class:`LoadTiming` if there is a report"""
+        if self.report is not None:
+            self.timing = self.report.start(unloading=unloading)
+    
+    def stop_timing(self):
+        """stop the current :class:`LoadTiming`, if any"""
+        if self.timing is not None:
+            self.timing.stop()
+            self.timing = None
+    
+    def timed(self, name, routine):
+        """call routine and add the time it took to the current 
+        :class:`LoadTiming` attribute name"""
+        if self.timing is None:
+            return routine()
+        started = default_timer()
+        try:
+            return routine()
+        finally:
+            setattr(self.timing, name, 
+                    getattr(self.timing, name) + default_timer() - started)
     
     def wrap_in_transaction(self, routine, unloading=False):
         """call routine in a load transaction"""
-        self.begin(unloading=unloading)
+        self.start_timing(unloading=unloading)
         try:
+            self.begin(unloading=unloading)
             try:
-                routine()
-            except:
-                self.rollback()
-                raise
-            else:
-                self.commit()
+                try:
+                    routine()
+                except:
+                    self.timed('rollback_time', self.rollback)
+                    raise
+                else:
+                    self.timed('commit_time', self.commit)
+            finally:
+                self.then_finally(unloading=unloading)
         finally:
-            self.then_finally(unloading=unloading)
+            self.stop_timing()
 
 class EnvLoadableFixture(LoadableFixture):
     """An abstract fixture that can resolve DataSet objects from an env.
@@ -358,21 +796,23 @@ class EnvLoadableFixture(LoadableFixture):
         
         storable = ds.meta.storable
         
-        if not storable:
+        # note that some storable objects (i.e. SQLAlchemy tables) 
+        # cannot be evaluated as a boolean
+        if storable is None:
             if not ds.meta.storable_name:
                 ds.meta.storable_name = self.style.guess_storable_name(
                                                         ds.__class__.__name__)
         
             if hasattr(self.env, 'get'):
                 storable = self.env.get(ds.meta.storable_name, None)
-            if not storable:
+            if storable is None:
                 if hasattr(self.env, ds.meta.storable_name):
                     try:
                         storable = getattr(self.env, ds.meta.storable_name)
                     except AttributeError:
                         pass
         
-            if not storable:
+            if storable is None:
                 repr_env = repr(type(self.env))
                 if hasattr(self.env, '__module__'):
                     repr_env = "%s from '%s'" % (repr_env, self.env.__module__)
@@ -428,6 +868,29 @@ class DBLoadableFixture(EnvLoadableFixture):
         """call transaction.rollback() on transaction returned by :meth:`DBLoadableFixture.create_transaction`"""
         self.transaction.rollback()
 
+def row_references_dataset(row, dataset_class):
+    """True if any column of row refers to a row in dataset_class.
+    
+    row can be a row class or a row instance.  Values are read with 
+    :func:`raw_column_values <fixture.dataset.dataset.raw_column_values>` 
+    so that :class:`Ref.Value <fixture.dataset.RefValue>` descriptors are 
+    not resolved.
+    """
+    def is_ref(val):
+        if is_rowlike(val):
+            return val._dataset is dataset_class
+        elif isinstance(val, Ref.Value):
+            return val.ref.dataset_class is dataset_class
+        return False
+    for name, val in raw_column_values(row):
+        if isinstance(val, (list, tuple, set)):
+            for v in val:
+                if is_ref(v):
+                    return True
+        elif is_ref(val):
+            return True
+    return False
+
 class DeferredStoredObject(object):
     """A stored representation of a row in a DataSet, deferred.
     
@@ -8,8 +8,15 @@ See :ref:`Using LoadableFixture<using-loadable-fixture>` for examples.
 """
 
 import sys
+import copy
+import hashlib
+from inspect import isclass
+from timeit import default_timer
+from six import reraise, text_type
+from fixture.dataset import Ref, is_rowlike, raw_column_values
 from fixture.loadable import DBLoadableFixture
-from fixture.exc import UninitializedError
+from fixture.loadable.loadable import LoadTiming, chunks
+from fixture.exc import UninitializedError, UnloadError
 import logging
 
 log = logging.getLogger('fixture.loadable.sqlalchemy_loadable')
@@ -97,20 +104,99 @@ class SQLAlchemyFixture(DBLoadableFixture):
         SQLAlchemy object so you should only set this if you know what you 
         doing.
     
+    ``unload_strategy``
+        How stored rows are removed at teardown.  By default each stored 
+        object is deleted one at a time.  The other choices are:
+        
+        ``'delete'``
+            delete the rows of each DataSet with one 
+            ``DELETE ... WHERE pk IN (...)`` statement per table
+        ``'truncate'``
+            empty every table that was loaded, including rows that fixture 
+            did not insert.  Only use this when the tables are owned by your 
+            fixtures.  PostgreSQL tables are emptied with a single 
+            ``TRUNCATE`` statement, other databases get one ``DELETE`` 
+            statement per table.
+        
+        ``'rollback'``
+            do not delete anything.  Data is loaded inside a ``SAVEPOINT`` 
+            of a connection transaction that is never committed and teardown 
+            rolls back to that savepoint.  This requires an ``engine`` or 
+            ``connection``, and the Application Under Test must use the same 
+            connection to see the data, i.e. ``Session(bind=fixture.connection)``.  
+            The outer transaction is opened by the first setup and is only 
+            rolled back by :meth:`dispose`.
+        
+        Except for ``'rollback'``, tables are emptied in the same dependency 
+        order that rows would be deleted in.
+    
+    ``use_snapshots``
+        If True, the rows inserted for a combination of DataSet classes are 
+        kept in memory the first time they are loaded (see 
+        :class:`TableSnapshot`).  When the same DataSet classes with the same 
+        rows are loaded again, those rows are inserted directly with one 
+        executemany per table, bypassing the storage medium.  Every mapped 
+        class must map to a single table.  Note that restored rows keep 
+        their original primary keys, so database sequences are not advanced.
+    
+    ``parallel``
+        The number of threads to load data with.  DataSet objects that do 
+        not depend on each other are loaded at the same time, each on its 
+        own connection from the ``engine`` pool and in its own transaction, 
+        which is committed as soon as the DataSet is loaded so that 
+        DataSet objects referencing it can see its rows.  All threads 
+        finish before the next group of DataSet objects is started.  If 
+        any DataSet fails to load, everything that was already committed 
+        is unloaded again before the error is raised.  Mapped objects are 
+        merged into the fixture's session afterwards, so the stored objects 
+        are the copies in that session.  This requires an 
+        ``engine`` and cannot be combined with 
+        ``unload_strategy='rollback'`` or ``use_snapshots``.
+    
+    ``bulk_insert``
+        If True, loading is done in batch mode and the rows of a mapped 
+        class that has no relationships are inserted with 
+        ``session.bulk_insert_mappings()``, skipping the unit of work, as 
+        long as every row of the batch declares its complete primary key.  
+        The inserted objects are attached to the session afterwards as if 
+        they had been queried.  Requires SQLAlchemy 1.0 or later, otherwise 
+        the objects are added to the session as usual.
+    
     """
     Medium = staticmethod(negotiated_medium)
+    unload_strategies = (None, 'delete', 'truncate', 'rollback')
     
-    def __init__(self, engine=None, connection=None, session=None, scoped_session=None, **kw):
+    def __init__(self, engine=None, connection=None, session=None, scoped_session=None, 
+                        unload_strategy=None, use_snapshots=False, 
+                        parallel=None, bulk_insert=False, **kw):
         # ensure import error by simulating what would happen in the global module :
         from sqlalchemy.orm import sessionmaker, scoped_session as sa_scoped_session 
         
+        if bulk_insert:
+            kw.setdefault('batch', True)
         DBLoadableFixture.__init__(self, **kw)
+        self.bulk_insert = bulk_insert
         self.engine = engine
         self.connection = connection
         self.session = session
         if scoped_session is None:
             scoped_session = Session
         self.Session = scoped_session
+        if unload_strategy not in self.unload_strategies:
+            raise ValueError(
+                "unload_strategy must be one of %s, not %r" % (
+                    self.unload_strategies, unload_strategy))
+        self.unload_strategy = unload_strategy
+        self.outer_transaction = None
+        self.savepoint = None
+        self.use_snapshots = use_snapshots
+        self.snapshot_cache = {}
+        if parallel and (unload_strategy == 'rollback' or use_snapshots):
+            raise ValueError(
+                "parallel loading cannot be combined with "
+                "unload_strategy='rollback' or use_snapshots")
+        self.parallel = parallel
+        self.unflushed = set()
     
     def begin(self, unloading=False):
         """Begin loading data
@@ -132,33 +218,57 @@ class SQLAlchemyFixture(DBLoadableFixture):
         if self.engine is not None and self.connection is None:
             self.connection = self.engine.connect()
         
+        if self.unload_strategy == 'rollback' and self.connection is None:
+            raise UninitializedError(
+                "unload_strategy='rollback' requires an engine or connection "
+                "to keep a transaction open on")
+        
         if self.session is None:
             if self.connection:
                 self.session = self.Session(bind=self.connection)
             else:
                 self.session = self.Session(bind=None)
+        if not unloading:
+            self.unflushed.clear()
             
         DBLoadableFixture.begin(self, unloading=unloading)
     
     def commit(self):
         """Commit the load transaction and flush the session
+        
+        When ``unload_strategy`` is ``'rollback'`` the session is flushed but 
+        the savepoint is kept open so that teardown can roll back to it.
         """
         if self.connection:
             # note that when not using a connection, calling session.commit() 
             # as the inheirted code does will automatically flush the session
             self.session.flush()
         
+        if self.unload_strategy == 'rollback':
+            self.savepoint = self.transaction
+            return
+        
         log.debug("transaction.commit() <- %s", self.transaction)
         DBLoadableFixture.commit(self)
     
     def create_transaction(self):
         """Create a session transaction or a connection transaction
         
+        - if ``unload_strategy`` is ``'rollback'``, calls 
+          connection.begin_nested() inside of an outer connection.begin() 
+          that stays open between setup and teardown
         - if a custom connection was used, calls connection.begin
         - otherwise calls session.begin()
         
         """
-        if self.connection is not None:
+        if self.unload_strategy == 'rollback':
+            if (self.outer_transaction is None or 
+                        not self.outer_transaction.is_active):
+                log.debug("connection.begin()")
+                self.outer_transaction = self.connection.begin()
+            log.debug("connection.begin_nested()")
+            transaction = self.connection.begin_nested()
+        elif self.connection is not None:
             log.debug("connection.begin()")
             transaction = self.connection.begin()
         else:
@@ -179,6 +289,8 @@ class SQLAlchemyFixture(DBLoadableFixture):
         """
         from fixture.dataset import dataset_registry
         dataset_registry.clear()
+        if self.outer_transaction and self.outer_transaction.is_active:
+            self.outer_transaction.rollback()
         if self.connection:
             self.connection.close()
         if self.session:
@@ -191,6 +303,317 @@ class SQLAlchemyFixture(DBLoadableFixture):
     def rollback(self):
         """Rollback load transaction"""
         DBLoadableFixture.rollback(self)
+    
+    def execute(self, stmt, *params):
+        """Execute a statement with the fixture's connection, if there is 
+        one, or else with its session."""
+        if self.connection:
+            return self.connection.execute(stmt, *params)
+        else:
+            return self.session.execute(stmt, *params)
+    
+    def flush(self):
+        """Flush the session and count the flush in the current 
+        :class:`LoadTiming <fixture.loadable.loadable.LoadTiming>`"""
+        log.debug("session.flush() <- %s", 
+                  [c.__name__ for c in self.unflushed])
+        self.session.flush()
+        self.unflushed.clear()
+        if self.timing is not None:
+            self.timing.flushes += 1
+    
+    def load_planned(self, plan, datasets, level=1):
+        """Load all datasets in plan, one stage at a time.
+        
+        The session is never flushed automatically, so columns of mapped 
+        objects that the database fills in (like generated primary keys) are 
+        unknown until the next flush.  Before each stage of the plan, the 
+        session is flushed once if a DataSet of that stage reads a column 
+        of a mapped object that was saved since the last flush.
+        """
+        roots = {}
+        for ds in datasets:
+            roots.setdefault(ds.__class__, ds)
+        for stage in plan.stages():
+            if self.unflushed:
+                for ds_class, ds_level in stage:
+                    if [ref_class for ref_class, col in 
+                                plan.columns_read[ds_class] 
+                                if ref_class in self.unflushed]:
+                        self.flush()
+                        break
+            for ds_class, ds_level in stage:
+                ds = roots.get(ds_class)
+                if ds is None:
+                    ds = ds_class.shared_instance(
+                                        default_refclass=self.dataclass)
+                self.load_rows(ds, ds_level + level - 1)
+                if isinstance(ds.meta.storage_medium, MappedClassMedium):
+                    self.unflushed.add(ds_class)
+    
+    def load(self, data):
+        """Load data
+        
+        When ``use_snapshots`` is True, data is restored from a 
+        :class:`TableSnapshot` if the same DataSet classes with the same rows 
+        were loaded before.
+        """
+        if self.parallel:
+            return self.load_in_parallel(data)
+        if not self.use_snapshots:
+            return DBLoadableFixture.load(self, data)
+        key = self.snapshot_key(data)
+        snapshot = self.snapshot_cache.get(key, None)
+        if snapshot is not None:
+            log.info("RESTORING snapshot of %s", key[0])
+            def restorer():
+                snapshot.restore(self)
+            self.wrap_in_transaction(restorer, unloading=False)
+            return
+        def loader():
+            for ds in data:
+                self.load_dataset(ds)
+            # mapped objects need to be in the database before taking a 
+            # snapshot:
+            self.session.flush()
+            self.snapshot_cache[key] = TableSnapshot.take(self)
+        self.wrap_in_transaction(loader, unloading=False)
+    
+    def load_in_parallel(self, data):
+        """Load data on ``parallel`` threads, one stage of the 
+        :class:`LoadPlan <fixture.loadable.loadable.LoadPlan>` at a time.
+        
+        See the ``parallel`` keyword argument for details.
+        """
+        from multiprocessing.pool import ThreadPool
+        datasets = [ds for ds in data]
+        plan = self.plan_load(datasets)
+        roots = dict([(ds.__class__, ds) for ds in datasets])
+        
+        def load_task(task):
+            ds, level, loaded = task
+            try:
+                return self.load_rows_in_worker(ds, level, loaded), None
+            except Exception:
+                return None, sys.exc_info()
+        
+        def loader():
+            if self.engine is None:
+                raise UninitializedError(
+                    "parallel loading requires an engine to connect with")
+            pool = ThreadPool(self.parallel)
+            try:
+                for stage in plan.stages():
+                    tasks = []
+                    for ds_class, level in stage:
+                        ds = roots.get(ds_class)
+                        if ds is None:
+                            ds = ds_class.shared_instance(
+                                                default_refclass=self.dataclass)
+                        self.attach_storage_medium(ds)
+                        tasks.append((ds, level, self.loaded))
+                    failure = None
+                    for (ds, level, loaded), (worker, exc_info) in zip(
+                                        tasks, pool.map(load_task, tasks)):
+                        if exc_info is not None:
+                            failure = failure or exc_info
+                            continue
+                        for worker_level, obj in worker.loaded.to_load():
+                            self.loaded.register(obj, worker_level)
+                        if worker.timing is not None:
+                            self.timing.add(worker.timing)
+                        self.adopt_stored_objects(ds)
+                    if failure is not None:
+                        reraise(*failure)
+            finally:
+                pool.close()
+                pool.join()
+        
+        try:
+            self.wrap_in_transaction(loader, unloading=False)
+        except Exception:
+            etype, val, tb = sys.exc_info()
+            # rows that were loaded so far have been committed :
+            if self.loaded is not None and self.loaded.registry:
+                try:
+                    self.unload()
+                except Exception:
+                    log.exception(
+                        "could not unload data after parallel load failed")
+            reraise(etype, val, tb)
+    
+    def load_rows_in_worker(self, ds, level, loaded):
+        """Load the rows of ds with a copy of this fixture bound to a new 
+        connection and commit them.
+        
+        Returns the copy.  Its ``loaded`` queue knows about everything in 
+        loaded plus ds and its ``timing``, if any, only covers ds.
+        """
+        worker = copy.copy(self)
+        worker.loaded = self.LoadQueue()
+        worker.loaded.registry = dict(loaded.registry)
+        if self.timing is not None:
+            worker.timing = LoadTiming()
+        worker.session = None
+        worker.connection = self.engine.connect()
+        try:
+            worker.session = sessionmaker(bind=worker.connection, 
+                                autoflush=False, expire_on_commit=False)()
+            worker.transaction = worker.connection.begin()
+            try:
+                worker.load_rows(ds, level)
+                worker.timed('commit_time', worker.commit)
+            except:
+                worker.timed('rollback_time', worker.rollback)
+                raise
+        finally:
+            if worker.session is not None:
+                worker.session.close()
+            worker.connection.close()
+        return worker
+    
+    def resolve_stored_object(self, column_val):
+        """Returns the stored object for column_val.
+        
+        When loading in parallel, a row can refer to mapped objects that 
+        belong to the session of this fixture or of another thread.  Those 
+        are merged into the session of the thread saving the row, without 
+        being loaded again.
+        """
+        column_val = DBLoadableFixture.resolve_stored_object(self, column_val)
+        if not self.parallel:
+            return column_val
+        if isinstance(column_val, (list, tuple, set)):
+            return type(column_val)([self.resolve_stored_object(v) 
+                                                    for v in column_val])
+        if is_mapped_class(type(column_val)):
+            from sqlalchemy.orm import object_session
+            session = object_session(column_val)
+            if session is not None and session is not self.session:
+                return self.session.merge(column_val, load=False)
+        return column_val
+    
+    def adopt_stored_objects(self, ds):
+        """Point the storage medium of ds at this fixture after it was loaded 
+        by another one and merge any mapped objects into this fixture's 
+        session.
+        
+        Stored objects are replaced by their merged copies, which refer to 
+        the objects already in the session instead of the copies that were 
+        merged into the session of the thread that loaded ds.  Inserted 
+        Table rows are selected right away so that threads loading DataSet 
+        objects that reference them do not use this fixture's connection.
+        """
+        medium = ds.meta.storage_medium
+        medium.visit_loader(self)
+        if isinstance(medium, MappedClassMedium):
+            stored = ds.meta._stored_objects
+            for pos, obj in enumerate(stored):
+                if obj not in self.session:
+                    stored[pos] = self.session.merge(obj, load=False)
+        elif isinstance(medium, TableMedium):
+            medium.materialize_rows()
+    
+    def snapshot_key(self, data):
+        """Returns a key for the DataSet classes in data and the content of 
+        their rows (and the rows of all DataSet classes they reference)
+        """
+        digest = hashlib.md5()
+        datasets = [ds for ds in data]
+        roots = dict([(ds.__class__, ds) for ds in datasets])
+        for ds_class, level in self.plan_load(datasets):
+            ds = roots.get(ds_class)
+            if ds is None:
+                ds = ds_class.shared_instance(default_refclass=self.dataclass)
+            digest.update(("%s.%s" % (ds_class.__module__, 
+                                      ds_class.__name__)).encode('utf-8'))
+            for key, row in ds:
+                for col, val in raw_column_values(row):
+                    digest.update(("%s.%s=%s" % (key, col, 
+                            describe_column_value(val))).encode('utf-8'))
+        return (tuple([ds.__class__ for ds in datasets]), digest.hexdigest())
+    
+    def unload(self):
+        """Unload data
+        
+        When ``unload_strategy`` is ``'rollback'`` this rolls back to the 
+        savepoint opened before data was loaded and no rows are deleted.
+        """
+        if self.unload_strategy != 'rollback' or self.loaded is None:
+            return DBLoadableFixture.unload(self)
+        from fixture.dataset import dataset_registry
+        self.start_timing(unloading=True)
+        try:
+            if self.savepoint is not None:
+                log.debug("savepoint.rollback() <- %s", self.savepoint)
+                self.timed('rollback_time', self.savepoint.rollback)
+                self.savepoint = None
+            # stored objects now refer to rows that no longer exist:
+            if hasattr(self.session, 'expunge_all'):
+                self.session.expunge_all()
+            else:
+                # < 0.5
+                self.session.clear()
+            # nothing is unloaded per DataSet but count that it was:
+            for dataset in self.loaded.to_unload():
+                self.count_unload(dataset, default_timer())
+            self.loaded.clear()
+            dataset_registry.clear()
+        finally:
+            self.stop_timing()
+    
+    def truncate_tables(self, tables):
+        """Delete all rows in tables, given in the order to empty them.
+        
+        All tables are truncated with a single statement in PostgreSQL 
+        (which would refuse to truncate a referenced table otherwise).  
+        Elsewhere, one ``DELETE`` statement without criteria is executed 
+        per table.
+        """
+        if not tables:
+            return
+        bind = self.session.get_bind(mapper=None, clause=tables[0])
+        if bind.dialect.name in ('postgresql', 'postgres'):
+            from sqlalchemy import text
+            preparer = bind.dialect.identifier_preparer
+            log.debug("TRUNCATE %s", tables)
+            self.session.execute(text("TRUNCATE TABLE %s" % ", ".join(
+                            [preparer.format_table(t) for t in tables])), 
+                        bind=bind)
+        else:
+            for table in tables:
+                log.debug("DELETE FROM %s", table)
+                self.session.execute(table.delete(), bind=bind)
+    
+    def unload_datasets(self, datasets):
+        """Unload datasets according to ``unload_strategy``"""
+        if self.unload_strategy is None:
+            return DBLoadableFixture.unload_datasets(self, datasets)
+        elif self.unload_strategy == 'delete':
+            for dataset in datasets:
+                started = default_timer()
+                dataset.meta.storage_medium.clearall_bulk()
+                self.count_unload(dataset, started)
+        elif self.unload_strategy == 'truncate':
+            datasets = list(datasets)
+            if not datasets:
+                return
+            tables = []
+            mediums = []
+            for dataset in datasets:
+                medium = dataset.meta.storage_medium
+                table = medium.get_table()
+                if table not in tables:
+                    tables.append(table)
+                mediums.append(medium)
+            started = default_timer()
+            self.truncate_tables(tables)
+            # the tables are emptied together, each DataSet gets its share:
+            share = (default_timer() - started) / len(datasets)
+            for dataset, medium in zip(datasets, mediums):
+                started = default_timer() - share
+                medium.discard_stored_objects()
+                self.count_unload(dataset, started)
 
 ## this was used in an if branch of clear() ... but I think this is no longer necessary with scoped sessions
 ## does it need to exist for 0.4 ?  not sure
@@ -217,6 +640,9 @@ class MappedClassMedium(DBLoadableFixture.StorageMediumAdapter):
     .. _Elixir: http://elixir.ematia.de/
     
     """
+    # the most primary keys to put in one statement
+    chunk_size = 500
+    
     def __init__(self, *a,**kw):
         DBLoadableFixture.StorageMediumAdapter.__init__(self, *a,**kw)
         
@@ -224,50 +650,173 @@ class MappedClassMedium(DBLoadableFixture.StorageMediumAdapter):
         """Delete this object from the session"""
         self.session.delete(obj)
     
+    def clearall_bulk(self):
+        """Delete all stored objects with one ``DELETE`` statement for every 
+        ``chunk_size`` primary keys, bypassing the session's unit of work.
+        
+        The stored objects are expunged from the session afterwards.
+        """
+        log.info("CLEARING stored objects for %s", self.dataset)
+        table = self.get_table()
+        keys = self.dataset.meta._stored_objects.primary_keys(
+                                                    self.stored_object_key)
+        try:
+            for chunk in chunks(keys, self.chunk_size):
+                self.session.query(self.medium).filter(
+                            primary_keys_clause(table, chunk)
+                        ).delete(synchronize_session=False)
+        except Exception:
+            etype, val, tb = sys.exc_info()
+            reraise(UnloadError, UnloadError(etype, val, self.dataset))
+        self.discard_stored_objects()
+    
+    def restore_stored_objects(self, keys, rows):
+        """Returns a persistent object for each primary key in keys after the 
+        rows were restored from a :class:`TableSnapshot`"""
+        table = self.get_table()
+        by_key = {}
+        for chunk in chunks(keys, self.chunk_size):
+            for obj in self.session.query(self.medium).filter(
+                                        primary_keys_clause(table, chunk)):
+                by_key[object_identity(obj)] = obj
+        return [by_key[key] for key in keys]
+    
+    def stored_object_key(self, obj):
+        """Returns the primary key of a stored object as a tuple"""
+        return object_identity(obj)
+    
+    def discard_stored_objects(self):
+        """Expunge all stored objects from the session after their rows were 
+        deleted in bulk"""
+        for obj in self.dataset.meta._stored_objects:
+            if obj in self.session:
+                self.session.expunge(obj)
+    
+    def get_table(self):
+        """Returns the table this class is mapped to"""
+        from sqlalchemy.orm import class_mapper
+        return class_mapper(self.medium).local_table
+    
     def visit_loader(self, loader):
         """Visits the :class:`SQLAlchemyFixture` loader and stores a reference to its session"""
         self.session = loader.session
-        
-    def save(self, row, column_vals):
-        """Save a new object to the session if it doesn't already exist in the session."""
+        self.bulk_insert = getattr(loader, 'bulk_insert', False)
+        # the loader counts its flushes:
+        self.flush = loader.flush
+    
+    def add_all(self, objects):
+        """Add objects to the session unless they are in it already"""
+        objects = [obj for obj in objects if obj not in self.session]
+        if hasattr(self.session, 'add_all'):
+            # sqlalchemy 0.5.2+
+            self.session.add_all(objects)
+        else:
+            for obj in objects:
+                self.session.save(obj)
+    
+    def can_bulk_insert(self):
+        """True if rows of the mapped class can be inserted without the 
+        unit of work"""
+        from sqlalchemy.orm import class_mapper
+        try:
+            from sqlalchemy.orm import make_transient_to_detached
+        except ImportError:
+            # < 0.9.5
+            return False
+        return (hasattr(self.session, 'bulk_insert_mappings') and 
+                not class_mapper(self.medium).relationships)
+    
+    def new_object(self, column_vals):
+        """Returns a new instance of the mapped class"""
         obj = self.medium()
         for c, val in column_vals:
             setattr(obj, c, val)
-        if obj not in self.session.new:
-            if hasattr(self.session, 'add'):
-                # sqlalchemy 0.5.2+
-                self.session.add(obj)
-            else:
-                self.session.save(obj)
         return obj
+        
+    def save(self, row, column_vals):
+        """Save a new object to the session if it doesn't already exist in the session."""
+        obj = self.new_object(column_vals)
+        self.add_all([obj])
+        return obj
+    
+    def save_batch(self, batch):
+        """Save a new object for every row with a single ``add_all``.
+        
+        When the loader was created with ``bulk_insert=True`` and every row 
+        declares its complete primary key, the rows are inserted by 
+        :meth:`save_bulk` instead.  Generated keys would not be known 
+        afterwards and could collide with the declared ones.
+        """
+        objects = [self.new_object(column_vals) for row, column_vals in batch]
+        if self.bulk_insert and self.can_bulk_insert():
+            from sqlalchemy.orm import class_mapper
+            mapper = class_mapper(self.medium)
+            pk_names = [mapper.get_property_by_column(c).key 
+                                                for c in mapper.primary_key]
+            mappings = [dict(column_vals) for row, column_vals in batch]
+            if not [params for params in mappings 
+                        for k in pk_names if params.get(k) is None]:
+                self.save_bulk(objects, mappings)
+                return objects
+        self.add_all(objects)
+        return objects
+    
+    def save_bulk(self, objects, mappings):
+        """Insert the rows of objects, given as dicts in mappings, with 
+        ``session.bulk_insert_mappings()``.
+        
+        The objects are then attached to the session as persistent objects 
+        so that they can be referenced and deleted like any other.
+        """
+        from sqlalchemy.orm import class_mapper, make_transient_to_detached
+        # pending rows may be referenced by the inserted ones:
+        self.flush()
+        log.debug("bulk_insert_mappings(%s) <- %s rows", 
+                  self.medium, len(mappings))
+        self.session.bulk_insert_mappings(class_mapper(self.medium), mappings)
+        for obj in objects:
+            make_transient_to_detached(obj)
+        self.add_all(objects)
 
 
 class LoadedTableRow(object):
-    def __init__(self, table, inserted_key, conn):
+    """A row inserted into a Table.
+    
+    Columns are selected by primary key the first time one is accessed 
+    unless the complete row was already known when it was inserted.  When the 
+    row was created by a :class:`TableMedium` then the medium selects all of 
+    its rows that have not been selected yet at once.
+    """
+    def __init__(self, table, inserted_key, conn, row=None, medium=None):
         self.table = table
         self.conn = conn
         self.inserted_key = [k for k in inserted_key]
-        self.row = None
+        self.row = row
+        self.medium = medium
+        if self.row is None and self.medium is not None:
+            self.medium.loaded_rows.append(self)
     
     def __getattr__(self, col):
-        if not self.row:
-            if len(self.inserted_key) > 1:
-                raise NotImplementedError(
-                    "%s does not support making a select statement with a "
-                    "composite key, %s.  This is probably fixable" % (
-                                        self.__class__.__name__, 
-                                        self.table.primary_key))
-            
-            first_pk = [k for k in self.table.primary_key][0]
-            id = getattr(self.table.c, first_pk.key)
-            stmt = self.table.select(id==self.inserted_key[0])
-            if self.conn:
-                c = self.conn.execute(stmt)
-            else:
-                c = stmt.execute()
-            self.row = c.fetchone()
+        if self.row is None:
+            if self.medium is not None:
+                self.medium.materialize_rows()
+            if self.row is None:
+                self.materialize()
         return getattr(self.row, col)
-             
+    
+    def materialize(self):
+        """Select this row by its primary key"""
+        stmt = self.table.select(
+                    primary_key_clause(self.table, self.inserted_key))
+        if self.medium is not None:
+            # the medium may have been given another connection since
+            c = self.medium._execute(stmt)
+        elif self.conn:
+            c = self.conn.execute(stmt)
+        else:
+            c = stmt.execute()
+        self.row = c.fetchone()
+
 class TableMedium(DBLoadableFixture.StorageMediumAdapter):
     """
     Adapter for `SQLAlchemy Table objects`_
@@ -282,23 +831,53 @@ class TableMedium(DBLoadableFixture.StorageMediumAdapter):
     
     """
             
+    # the most primary keys to put in one statement
+    chunk_size = 500
+            
     def __init__(self, *a,**kw):
         DBLoadableFixture.StorageMediumAdapter.__init__(self, *a,**kw)
         self.conn = None
+        self.loaded_rows = []
         
     def clear(self, obj):
-        """Constructs a delete statement per each primary key and 
+        """Constructs a delete statement for the primary key and 
         executes it either explicitly or implicitly
         """
-        i=0
-        for k in obj.table.primary_key:
-            id = getattr(obj.table.c, k.key)
-            stmt = obj.table.delete(id==obj.inserted_key[i])
-            if self.conn:
-                c = self.conn.execute(stmt)
-            else:
-                c = stmt.execute()
-            i+=1
+        stmt = obj.table.delete(
+                    primary_key_clause(obj.table, obj.inserted_key))
+        self._execute(stmt)
+        # all stored rows are being deleted, none of them should be selected:
+        self.loaded_rows = []
+    
+    def clearall_bulk(self):
+        """Delete all stored rows with one ``DELETE`` statement for every 
+        ``chunk_size`` primary keys"""
+        log.info("CLEARING stored objects for %s", self.dataset)
+        table = self.get_table()
+        keys = self.dataset.meta._stored_objects.primary_keys(
+                                                    self.stored_object_key)
+        try:
+            for chunk in chunks(keys, self.chunk_size):
+                self._execute(table.delete(primary_keys_clause(table, chunk)))
+        except Exception:
+            etype, val, tb = sys.exc_info()
+            reraise(UnloadError, UnloadError(etype, val, self.dataset))
+        self.discard_stored_objects()
+    
+    def discard_stored_objects(self):
+        """Forget about stored rows after they were deleted in bulk"""
+        self.loaded_rows = []
+    
+    def restore_stored_objects(self, keys, rows):
+        """Returns a :class:`LoadedTableRow` for each primary key in keys 
+        and its row after the rows were restored from a :class:`TableSnapshot`"""
+        table = self.get_table()
+        return [LoadedTableRow(table, key, self.conn, row=row, medium=self)
+                                            for key, row in zip(keys, rows)]
+    
+    def stored_object_key(self, obj):
+        """Returns the primary key of a stored row as a tuple"""
+        return tuple(obj.inserted_key)
     
     def visit_loader(self, loader):
         """Visits the :class:`SQLAlchemyFixture` loader and stores a reference 
@@ -309,39 +888,331 @@ class TableMedium(DBLoadableFixture.StorageMediumAdapter):
         else:
             self.conn = None
         
-    def save(self, row, column_vals):
-        """Constructs an insert statement with the given values and 
-        executes it either explicitly or implicitly
-        """
+    def _execute(self, stmt, *params):
+        if self.conn:
+            return self.conn.execute(stmt, *params)
+        else:
+            return stmt.execute(*params)
+    
+    def get_table(self):
+        """Returns the Table, raises ValueError if the medium is not a Table"""
         from sqlalchemy.schema import Table
         if not isinstance(self.medium, Table):
             raise ValueError(
                 "medium %s must be a Table instance" % self.medium)
-                
-        stmt = self.medium.insert()
+        return self.medium
+        
+    def save(self, row, column_vals):
+        """Constructs an insert statement with the given values and 
+        executes it either explicitly or implicitly
+        """
+        table = self.get_table()
+        stmt = table.insert()
         params = dict(list(column_vals))
-        if self.conn:
-            c = self.conn.execute(stmt, params)
-        else:
-            c = stmt.execute(params)
+        c = self._execute(stmt, params)
 
         # In SQLAlchemy 0.8 this changed to a property with another name
         if hasattr(c, "primary_key"):
             primary_key = c.primary_key
+        elif hasattr(c, "inserted_primary_key"):
+            primary_key = c.inserted_primary_key
         else:
             primary_key = c.last_inserted_ids()
 
         if primary_key is None:
             raise NotImplementedError(
                     "what can we do with a None primary key?")
-        table_keys = [k for k in self.medium.primary_key]
+        table_keys = [k for k in table.primary_key]
         inserted_keys = [k for k in primary_key]
         if len(inserted_keys) != len(table_keys):
             raise ValueError(
                 "expected primary_key %s, got %s (using table %s)" % (
-                                table_keys, inserted_keys, self.medium))
+                                table_keys, inserted_keys, table))
+        
+        return LoadedTableRow(table, primary_key, self.conn, medium=self)
+    
+    def _get_dialect(self):
+        bind = self.conn
+        if bind is None:
+            bind = self.medium.bind
+        if bind is None:
+            return None
+        return bind.dialect
+    
+    def save_batch(self, batch):
+        """Inserts all rows that declare their complete primary key with a 
+        single executemany statement (one per distinct set of columns).
+        
+        Rows that leave their primary key to the database are inserted one 
+        at a time with :meth:`save` since their generated key is needed to 
+        reference them.
+        
+        If the database supports it (see :func:`supports_insert_returning`) 
+        then all rows are inserted with a multi-row ``INSERT ... RETURNING`` 
+        statement instead, see :meth:`save_batch_returning`.
+        """
+        table = self.get_table()
+        if supports_insert_returning(self._get_dialect()):
+            return self.save_batch_returning(batch)
+        pk_names = [k.key for k in table.primary_key]
+        stored = [None for pair in batch]
+        executemany = {}
+        column_sets = []
+        for i, (row, column_vals) in enumerate(batch):
+            params = dict(column_vals)
+            if [n for n in pk_names if params.get(n) is None]:
+                continue
+            columns = tuple(sorted(params.keys()))
+            if columns not in executemany:
+                executemany[columns] = []
+                column_sets.append(columns)
+            executemany[columns].append((i, params))
         
-        return LoadedTableRow(self.medium, primary_key, self.conn)
+        for columns in column_sets:
+            inserts = executemany[columns]
+            self._execute(table.insert(), [params for i, params in inserts])
+            for i, params in inserts:
+                stored[i] = LoadedTableRow(
+                        table, [params[n] for n in pk_names], self.conn, 
+                        medium=self)
+        
+        for i, (row, column_vals) in enumerate(batch):
+            if stored[i] is None:
+                stored[i] = self.save(row, column_vals)
+        return stored
+    
+    def save_batch_returning(self, batch):
+        """Inserts rows with one ``INSERT ... VALUES (...), (...) RETURNING`` 
+        statement per distinct set of columns and every ``chunk_size`` rows.
+        
+        No database documents the order in which the rows of a multi-row 
+        ``VALUES`` list are returned, so they are matched to the DataSet rows 
+        by primary key, which requires every row to declare its complete 
+        primary key.  Rows that leave their key to the database are inserted 
+        with an executemany ``INSERT ... RETURNING`` when SQLAlchemy 2.0 can 
+        return its rows in the order of the parameters 
+        (``sort_by_parameter_order``), otherwise one at a time with 
+        :meth:`save`.
+        
+        Each stored :class:`LoadedTableRow` is created with the complete row 
+        returned by the database so that referencing its columns (i.e. a 
+        generated id) does not need another select.
+        """
+        table = self.get_table()
+        pk_names = [k.key for k in table.primary_key]
+        stored = [None for pair in batch]
+        inserts = {}
+        column_sets = []
+        for i, (row, column_vals) in enumerate(batch):
+            params = dict(column_vals)
+            generated = bool([n for n in pk_names if params.get(n) is None])
+            columns = (generated, tuple(sorted(params.keys())))
+            if columns not in inserts:
+                inserts[columns] = []
+                column_sets.append(columns)
+            inserts[columns].append((i, params))
+        
+        def store(i, inserted):
+            stored[i] = LoadedTableRow(
+                    table, [getattr(inserted, n) for n in pk_names], 
+                    self.conn, row=inserted, medium=self)
+        
+        for generated, columns in column_sets:
+            members = inserts[(generated, columns)]
+            if generated and (sa_major is None or sa_major < 2.0):
+                # saved one at a time below
+                continue
+            for chunk in chunks(members, self.chunk_size):
+                if generated:
+                    returned = self._execute(
+                        table.insert().returning(
+                            *[c for c in table.c], 
+                            **{'sort_by_parameter_order': True}), 
+                        [params for i, params in chunk]).fetchall()
+                else:
+                    returned = self._execute(
+                        table.insert().values(
+                            [params for i, params in chunk]
+                        ).returning(*[c for c in table.c])).fetchall()
+                if len(returned) != len(chunk):
+                    raise ValueError(
+                        "expected %s rows returned from %s, got %s" % (
+                                        len(chunk), table, len(returned)))
+                if generated:
+                    for (i, params), inserted in zip(chunk, returned):
+                        store(i, inserted)
+                    continue
+                # keys are compared as text since declared values may have 
+                # another type than the column (i.e. read from a CSV file)
+                by_pk = dict([
+                    (tuple([text_type(getattr(r, n)) for n in pk_names]), r)
+                    for r in returned])
+                for i, params in chunk:
+                    pk = tuple([text_type(params[n]) for n in pk_names])
+                    try:
+                        store(i, by_pk[pk])
+                    except KeyError:
+                        raise ValueError(
+                            "no row returned from %s for primary key %s" % (
+                                                            table, pk))
+        
+        for i, (row, column_vals) in enumerate(batch):
+            if stored[i] is None:
+                stored[i] = self.save(row, column_vals)
+        return stored
+    
+    def materialize_rows(self):
+        """Selects the columns of every :class:`LoadedTableRow` saved by this 
+        medium that has not been selected yet.
+        
+        This is called the first time a column of any such row is accessed 
+        and uses one ``WHERE pk IN (...)`` statement for every 
+        ``chunk_size`` rows (or a disjunction of primary key 
+        comparisons for composite keys).
+        """
+        pending = [r for r in self.loaded_rows if r.row is None]
+        self.loaded_rows = []
+        if not pending:
+            return
+        table = self.get_table()
+        pk_cols = [k for k in table.primary_key]
+        by_key = {}
+        for r in pending:
+            by_key[tuple(r.inserted_key)] = r
+        for chunk in chunks(list(by_key.keys()), self.chunk_size):
+            stmt = table.select(primary_keys_clause(table, chunk))
+            for fetched in self._execute(stmt).fetchall():
+                key = tuple([getattr(fetched, k.name) for k in pk_cols])
+                if key in by_key:
+                    by_key[key].row = fetched
+
+class TableSnapshot(object):
+    """The rows that were inserted when loading some DataSet classes.
+    
+    A snapshot is taken by :class:`SQLAlchemyFixture` when ``use_snapshots`` 
+    is True.  For each DataSet, in the order it was loaded, the snapshot 
+    keeps its level in the :class:`LoadQueue <fixture.loadable.loadable.LoadQueue>`, 
+    its row keys, their primary keys and the rows selected from its table.
+    """
+    def __init__(self, entries):
+        self.entries = entries
+    
+    def __repr__(self):
+        return "<%s at %s for %s>" % (
+            self.__class__.__name__, hex(id(self)), 
+            [entry[0].__name__ for entry in self.entries])
+    
+    @classmethod
+    def take(cls, loader):
+        """Select the rows stored by everything the loader has loaded"""
+        entries = []
+        for level, ds in loader.loaded.to_load():
+            medium = ds.meta.storage_medium
+            table = medium.get_table()
+            store = ds.meta._stored_objects
+            keys = store.keys()
+            pks = [medium.stored_object_key(store.get_object(k)) for k in keys]
+            pk_cols = [k for k in table.primary_key]
+            # stored objects may hold keys of another type than the column, 
+            # like the strings of a CSV file, so keys are compared as text
+            # and then taken from the selected rows:
+            by_pk = {}
+            for chunk in chunks(pks, medium.chunk_size):
+                stmt = table.select(primary_keys_clause(table, chunk))
+                for row in loader.execute(stmt).fetchall():
+                    by_pk[tuple([text_type(getattr(row, c.name)) 
+                                 for c in pk_cols])] = row
+            rows = [by_pk[tuple([text_type(v) for v in pk])] for pk in pks]
+            pks = [tuple([getattr(row, c.name) for c in pk_cols]) 
+                   for row in rows]
+            entries.append((ds.__class__, level, keys, pks, rows))
+        return cls(entries)
+    
+    def restore(self, loader):
+        """Insert all rows of the snapshot and store each of them in its 
+        DataSet as if the loader had just loaded it.
+        
+        A :class:`FileDataSet <fixture.dataset.converter.FileDataSet>` does 
+        not keep its rows, only their stored objects are restored.
+        """
+        from fixture.dataset.converter import FileDataSet
+        for ds_class, level, keys, pks, rows in self.entries:
+            ds = ds_class.shared_instance(default_refclass=loader.dataclass)
+            loader.attach_storage_medium(ds)
+            medium = ds.meta.storage_medium
+            medium.visit_loader(loader)
+            table = medium.get_table()
+            if rows:
+                loader.execute(table.insert(), [
+                    dict([(c.key, getattr(row, c.name)) for c in table.c]) 
+                                                            for row in rows])
+            loader.loaded.register(ds, level)
+            stored = medium.restore_stored_objects(pks, rows)
+            if isinstance(ds, FileDataSet):
+                for key, obj in zip(keys, stored):
+                    ds.meta._stored_objects.store(key, obj)
+                continue
+            for key, obj in zip(keys, stored):
+                row = ds[key]
+                loader.resolve_row_references(ds, row)
+                if isclass(row):
+                    row = row(ds)
+                ds.meta._stored_objects.store(key, obj)
+                ds._setdata(key, row)
+
+def describe_column_value(val):
+    """Returns a string that identifies a DataSet column value, 
+    including references to other rows"""
+    if is_rowlike(val):
+        return "%s.%s" % (val._dataset.__name__, val.__name__)
+    elif isinstance(val, Ref.Value):
+        return "%s.%s.%s" % (val.ref.dataset_class.__name__, val.ref.key, 
+                             val.attr_name)
+    elif isinstance(val, (list, tuple)):
+        return "[%s]" % ", ".join([describe_column_value(v) for v in val])
+    elif isinstance(val, set):
+        return "{%s}" % ", ".join(
+                            sorted([describe_column_value(v) for v in val]))
+    return repr(val)
+
+def object_identity(obj):
+    """Returns the primary key of a persistent mapped object as a tuple 
+    without loading its expired attributes"""
+    try:
+        from sqlalchemy import inspect
+    except ImportError:
+        # < 0.8
+        from sqlalchemy.orm import object_mapper
+        return tuple(object_mapper(obj).primary_key_from_instance(obj))
+    return tuple(inspect(obj).identity)
+
+def primary_key_clause(table, key):
+    """Returns a where clause matching the primary key values in key"""
+    from sqlalchemy import and_
+    return and_(*[col==val for col, val in zip(table.primary_key, key)])
+
+def primary_keys_clause(table, keys):
+    """Returns a where clause matching any of the primary key values in keys 
+    (a list of key tuples)"""
+    from sqlalchemy import or_
+    pk_cols = [k for k in table.primary_key]
+    if len(pk_cols) == 1:
+        return pk_cols[0].in_([key[0] for key in keys])
+    return or_(*[primary_key_clause(table, key) for key in keys])
+
+def supports_insert_returning(dialect):
+    """True if dialect can return the rows of a multi-row INSERT statement.
+    
+    dialect can be None, i.e. when a Table is not bound to anything.
+    """
+    if dialect is None:
+        return False
+    if not getattr(dialect, 'supports_multivalues_insert', False):
+        return False
+    if hasattr(dialect, 'insert_returning'):
+        # SQLAlchemy 2.0
+        return dialect.insert_returning
+    return getattr(dialect, 'implicit_returning', False)
 
 def is_assigned_mapper(obj):
     import sqlalchemy
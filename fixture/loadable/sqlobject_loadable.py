@@ -22,7 +22,7 @@ class SQLObjectMedium(DBLoadableFixture.StorageMediumAdapter):
         from sqlobject.styles import getStyle
         so_style = getStyle(self.medium)
 
-        if hasattr(row, 'connection'):
+        if 'connection' in row.columns():
             raise ValueError(
                     "cannot name a key 'connection' in row %s" % row)
         dbvals = dict([(so_style.dbColumnToPythonAttr(k), v) 
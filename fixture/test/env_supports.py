@@ -16,3 +16,4 @@ sqlobject = module_exists('sqlobject')
 sqlalchemy = module_exists('sqlalchemy')
 elixir = module_exists('elixir')
 storm = module_exists('storm')
+numpy = module_exists('numpy')
@@ -246,4 +246,72 @@ class TestFixture:
         eq_(mock_call_log[-3], ('some_callable', Fixture.Data))
         eq_(mock_call_log[-2], (MockLoader, 'unload'))
         eq_(mock_call_log[-1], 'my_custom_teardown')
-        
\ No newline at end of file
+        
+class TestSharedData:
+    def setUp(self):
+        reset_mock_call_log()
+        self.fxt = Fixture(loader=MockLoader(), dataclass=StubSuperSet)
+    
+    def tearDown(self):
+        reset_mock_call_log()
+    
+    @attr(unit=True)
+    def test_shared_data_loads_once_and_unloads_after_last_release(self):
+        data = self.fxt.shared_data(StubDataset1, StubDataset2)
+        same_data = self.fxt.shared_data(StubDataset1, StubDataset2)
+        assert data is same_data
+        eq_(mock_call_log, [(MockLoader, 'load', StubSuperSet)])
+        data.release()
+        eq_(len(mock_call_log), 1)
+        same_data.release()
+        eq_(mock_call_log[-1], (MockLoader, 'unload'))
+        
+    @attr(unit=True)
+    def test_shared_data_is_reloaded_after_release(self):
+        data = self.fxt.shared_data(StubDataset1)
+        data.release()
+        data = self.fxt.shared_data(StubDataset1)
+        data.release()
+        eq_(mock_call_log, [
+            (MockLoader, 'load', StubSuperSet), (MockLoader, 'unload'),
+            (MockLoader, 'load', StubSuperSet), (MockLoader, 'unload')])
+        
+    @attr(unit=True)
+    def test_shared_data_is_separate_per_scope(self):
+        data = self.fxt.shared_data(StubDataset1, scope='some.module')
+        other_data = self.fxt.shared_data(StubDataset1, scope='other.module')
+        assert data is not other_data
+        data.release()
+        other_data.release()
+        eq_(len(mock_call_log), 4)
+        
+    @attr(unit=True)
+    def test_shared_data_implements_with_statement(self):
+        data = self.fxt.shared_data(StubDataset1)
+        eq_(data.__enter__(), data)
+        eq_(data.users, 1)
+        data.__exit__(None, None, None)
+        eq_(data.users, 0)
+        eq_(mock_call_log, [
+            (MockLoader, 'load', StubSuperSet), (MockLoader, 'unload')])
+        
+    @attr(unit=True)
+    @raises(ValueError)
+    def test_shared_data_cannot_be_released_twice(self):
+        data = self.fxt.shared_data(StubDataset1)
+        data.release()
+        data.release()
+        
+    @attr(unit=True)
+    def test_read_only_with_data_shares_data_held_by_module(self):
+        held = self.fxt.shared_data(StubDataset1, scope=__name__)
+        @self.fxt.with_data(StubDataset1, read_only=True)
+        def some_callable(data):
+            mock_call_log.append(('some_callable', data))
+        some_callable()
+        some_callable()
+        eq_(mock_call_log, [
+            (MockLoader, 'load', StubSuperSet),
+            ('some_callable', held), ('some_callable', held)])
+        held.release()
+        eq_(mock_call_log[-1], (MockLoader, 'unload'))
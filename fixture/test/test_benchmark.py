@@ -0,0 +1,61 @@
+
+from nose.exc import SkipTest
+from nose.tools import eq_
+from fixture.benchmark import BenchGraph, bench_load, bench_registry
+from fixture.test import attr, env_supports
+
+@attr(unit=True)
+def test_graph():
+    graph = BenchGraph(depth=3, fanout=2, rows=12, self_refs=True)
+    eq_(len(graph.tables), 7)
+    eq_(graph.tables[-1].dataset, graph.root)
+    eq_([t.name for t in graph.tables[-1].children], ['Bench2', 'Bench5'])
+    root = graph.root()
+    eq_(root.meta.keys[:3], ['r00', 'r01', 'r02'])
+    eq_(root.r11.id, 12)
+    eq_(root.r11.parent_id.ref.key, 'r10')
+    eq_(root.r11.ref1_id.ref.dataset_class, graph.tables[-2].dataset)
+    eq_(graph.params()['total_rows'], 84)
+
+@attr(unit=True)
+def test_bench_registry():
+    results = bench_registry(sizes=(1, 3), number=10)
+    eq_(sorted(set([r['datasets'] for r in results])), [1, 3])
+    for result in results:
+        assert result['seconds'] > 0
+
+@attr(functional=1)
+def test_bench_load():
+    if not env_supports.sqlalchemy:
+        raise SkipTest
+    graph = BenchGraph(depth=2, fanout=2, rows=5, self_refs=True)
+    results = bench_load(graph, loaders=['sqlalchemy-table',
+                                         'sqlalchemy-mapped'], repeat=1)
+    eq_([r['loader'] for r in results], 
+        ['sqlalchemy-table', 'sqlalchemy-mapped'])
+    for result in results:
+        eq_(result['total_rows'], 15)
+        assert result['setup_seconds'] > 0
+        assert result['teardown_seconds'] > 0
+
+def check_bench_load(loader):
+    graph = BenchGraph(depth=2, fanout=2, rows=5, self_refs=True)
+    results = bench_load(graph, loaders=[loader], repeat=2)
+    eq_([r['loader'] for r in results], [loader])
+    eq_(results[0]['total_rows'], 15)
+    assert results[0]['setup_seconds'] > 0
+    assert results[0]['teardown_seconds'] > 0
+    # each run must start from a clean environment
+    eq_(len(bench_load(graph, loaders=[loader], repeat=1)), 1)
+
+@attr(functional=1)
+def test_bench_load_sqlobject():
+    if not env_supports.sqlobject:
+        raise SkipTest
+    check_bench_load('sqlobject')
+
+@attr(functional=1)
+def test_bench_load_storm():
+    if not env_supports.storm:
+        raise SkipTest
+    check_bench_load('storm')
@@ -5,6 +5,8 @@ from fixture.test import attr
 from nose.tools import eq_, raises
 from six import StringIO
 
+from fixture import TempIO
+
 
 try:
     import json
@@ -138,3 +140,220 @@ class TestDatasetToJson(object):
                          }]
             })
         )
+
+
+class TestStreamDatasetToJson(object):
+    class WriteCounter(object):
+        def __init__(self):
+            self.writes = []
+        def write(self, s):
+            self.writes.append(s)
+        def getvalue(self):
+            return ''.join(self.writes)
+
+    @attr(unit=1)
+    def test_same_as_dataset_to_json(self):
+        fp = StringIO()
+        stream_dataset_to_json(MuchoData, fp)
+        eq_(fp.getvalue(), dataset_to_json(MuchoData))
+        fp = StringIO()
+        stream_dataset_to_json(FooData, fp)
+        eq_(json.loads(fp.getvalue()), json.loads(dataset_to_json(FooData)))
+
+    @attr(unit=1)
+    def test_lines(self):
+        fp = StringIO()
+        stream_dataset_to_json(FooData, fp, lines=True)
+        eq_([json.loads(line) for line in fp.getvalue().splitlines()], [
+            {'name': "call me bar", 'is_alive': False},
+            {'name': "name's foo", 'is_alive': True}])
+        assert fp.getvalue().endswith('\n')
+
+    @attr(unit=1)
+    def test_writes_are_buffered(self):
+        fp = self.WriteCounter()
+        stream_dataset_to_json(FooData, fp)
+        eq_(len(fp.writes), 1)
+        fp = self.WriteCounter()
+        stream_dataset_to_json(FooData, fp, buffer_size=1)
+        eq_(len(fp.writes), 3)
+        eq_(json.loads(fp.getvalue()), json.loads(dataset_to_json(FooData)))
+
+    @attr(unit=1)
+    def test_compact_rows(self):
+        class CompactFooData(FooData):
+            class Meta:
+                compact = True
+        fp = StringIO()
+        stream_dataset_to_json(CompactFooData, fp)
+        eq_(json.loads(fp.getvalue()), json.loads(dataset_to_json(FooData)))
+
+
+class TestFileDataSets(object):
+    def setUp(self):
+        self.tmp = TempIO()
+        self.tmp.putfile('people.csv', 
+                         "key,name,age\nbob,\"Bob, B.\",33\nbetty,Betty,28\n")
+        self.tmp.putfile('people.jsonl', 
+                         '{"key": "bob", "name": "Bob, B.", "age": 33}\n'
+                         '\n'
+                         '{"key": "betty", "name": "Betty"}\n')
+
+    def tearDown(self):
+        del self.tmp
+
+    def rows(self, ds):
+        return [(key, [(c, getattr(row, c)) for c in row.columns()]) 
+                                                    for key, row in ds]
+
+    @attr(unit=1)
+    def test_csv(self):
+        class PeopleData(CSVDataSet):
+            filename = self.tmp.join('people.csv')
+        people = PeopleData()
+        eq_(self.rows(people), [
+            ('bob', [('key', 'bob'), ('name', 'Bob, B.'), ('age', '33')]),
+            ('betty', [('key', 'betty'), ('name', 'Betty'), ('age', '28')]),
+        ])
+        # rows are read again every time
+        eq_(len(self.rows(people)), 2)
+        eq_(people.meta.keys, [])
+
+    @attr(unit=1)
+    def test_csv_mmap_with_declared_columns(self):
+        self.tmp.putfile('people_noheader.csv', "bob,\"Bob, B.\",33\n")
+        class PeopleData(CSVDataSet):
+            filename = self.tmp.join('people_noheader.csv')
+            mmap = True
+            key_column = 'label'
+            store_key = False
+            columns = ('label', 'name', 'age')
+        eq_(self.rows(PeopleData()), [
+            ('bob', [('name', 'Bob, B.'), ('age', '33')]),
+        ])
+
+    @attr(unit=1)
+    def test_jsonl(self):
+        class PeopleData(JSONLinesDataSet):
+            filename = self.tmp.join('people.jsonl')
+            key_column = 'key'
+            store_key = False
+        eq_(self.rows(PeopleData()), [
+            ('bob', [('age', 33), ('name', 'Bob, B.')]),
+            ('betty', [('age', None), ('name', 'Betty')]),
+        ])
+
+    @attr(unit=1)
+    def test_jsonl_mmap(self):
+        class PeopleData(JSONLinesDataSet):
+            filename = self.tmp.join('people.jsonl')
+            columns = ('key', 'name')
+            mmap = True
+        eq_(self.rows(PeopleData()), [
+            ('bob', [('key', 'bob'), ('name', 'Bob, B.')]),
+            ('betty', [('key', 'betty'), ('name', 'Betty')]),
+        ])
+
+    @attr(unit=1)
+    def test_batch_size_default(self):
+        class PeopleData(CSVDataSet):
+            class Meta:
+                storable_name = 'Person'
+            filename = self.tmp.join('people.csv')
+        eq_(PeopleData().meta.batch_size, 1000)
+        eq_(PeopleData().meta.storable_name, 'Person')
+
+
+class PersonData(DataSet):
+    class bob:
+        name = "Bob"
+        age = 33
+    class betty:
+        name = u"Bettÿ"
+        age = None
+        weight = 52.5
+
+
+class PetData(DataSet):
+    class fido:
+        owner = PersonData.bob
+        owner_name = PersonData.bob.ref('name')
+        tags = ['good', 'dog']
+        is_alive = True
+    class rex(fido):
+        owners = set([PersonData.bob, PersonData.betty])
+        is_alive = False
+
+
+class TestBinaryDataSet(object):
+    def setUp(self):
+        self.tmp = TempIO()
+
+    def tearDown(self):
+        del self.tmp
+
+    def write(self, dataset, name='data.bin'):
+        filename = self.tmp.join(name)
+        fp = open(filename, 'wb')
+        try:
+            dataset_to_binary(dataset, fp)
+        finally:
+            fp.close()
+        return filename
+
+    def rows(self, ds):
+        return [(key, [(c, getattr(row, c)) for c in row.columns()]) 
+                                                    for key, row in ds]
+
+    @attr(unit=1)
+    def test_round_trip(self):
+        filename = self.write(PersonData)
+        class People(BinaryDataSet):
+            pass
+        People.filename = filename
+        eq_(self.rows(People()), self.rows(PersonData()))
+
+    @attr(unit=1)
+    def test_round_trip_with_mmap(self):
+        filename = self.write(MuchoData)
+        class Mucho(BinaryDataSet):
+            mmap = True
+        Mucho.filename = filename
+        eq_(self.rows(Mucho()), [('mucho', [
+            ('d', '2008-01-01'), ('dec', '1.45667'), 
+            ('dt', '2008-01-01 02:30:59'), ('fl', 1.45667)])])
+
+    @attr(unit=1)
+    def test_references(self):
+        filename = self.write(PetData)
+        class Pets(BinaryDataSet):
+            class Meta:
+                references = [PersonData]
+        Pets.filename = filename
+        rows = dict([(key, dict(raw_column_values(row))) 
+                                                for key, row in Pets()])
+        assert rows['fido']['owner'] is PersonData.bob
+        owner_name = rows['fido']['owner_name']
+        eq_(owner_name.ref.dataset_class, PersonData)
+        eq_(owner_name.ref.key, 'bob')
+        eq_(owner_name.attr_name, 'name')
+        eq_(rows['fido']['tags'], ['good', 'dog'])
+        eq_(rows['rex']['owners'], set([PersonData.bob, PersonData.betty]))
+        eq_(rows['rex']['is_alive'], False)
+
+    @attr(unit=1)
+    @raises(ValueError)
+    def test_references_must_be_declared(self):
+        filename = self.write(PetData)
+        class Pets(BinaryDataSet):
+            pass
+        Pets.filename = filename
+        list(Pets())
+
+    @attr(unit=1)
+    @raises(ValueError)
+    def test_not_a_binary_file(self):
+        class Foo(BinaryDataSet):
+            pass
+        Foo.filename = self.tmp.putfile('foo.bin', 'not a binary file')
+        list(Foo())
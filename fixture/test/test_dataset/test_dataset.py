@@ -1,9 +1,10 @@
-from nose.tools import eq_
+from nose.exc import SkipTest
+from nose.tools import eq_, raises
 
-from fixture import DataSet
+from fixture import DataSet, ColumnarDataSet
 from fixture.dataset import (
-    Ref, DataRow, SuperSet, MergedSuperSet, is_rowlike)
-from fixture.test import attr
+    Ref, DataRow, DataSetStore, SuperSet, MergedSuperSet, is_rowlike)
+from fixture.test import attr, env_supports
 
 
 class Books(DataSet):
@@ -138,6 +139,47 @@ class TestDataRow(object):
         row = DataRow(StubDataSet)
         assert is_rowlike(row), "expected %s to be rowlike" % row
 
+    @attr(unit=True)
+    def test_columns_are_cached_per_class(self):
+        row_class = type('lolita', (DataRow,), dict(title='lolita'))
+        eq_(list(row_class.columns()), ['title'])
+        cached = row_class.__dict__['_columns']
+        row_class.title = 'Lolita'
+        eq_(list(row_class.columns()), ['title'])
+        assert row_class.__dict__['_columns'] is cached
+
+    @attr(unit=True)
+    def test_columns_see_class_changes(self):
+        class BookRow(DataRow):
+            title = None
+        row_class = type('lolita', (BookRow,), dict(title='lolita'))
+        eq_(list(row_class.columns()), ['title'])
+        BookRow.author = 'Nabokov'
+        eq_(list(row_class.columns()), ['author', 'title'])
+        del BookRow.author
+        eq_(list(row_class.columns()), ['title'])
+
+    @attr(unit=True)
+    def test_columns_see_new_bases(self):
+        class BookRow(DataRow):
+            title = None
+        class AuthoredRow(DataRow):
+            author = None
+        row_class = type('lolita', (BookRow,), {})
+        eq_(list(row_class.columns()), ['title'])
+        row_class.__bases__ = (AuthoredRow,)
+        eq_(list(row_class.columns()), ['author'])
+
+    @attr(unit=True)
+    def test_columns_ignore_instance_attributes(self):
+        class StubDataSet(DataSet):
+            pass
+        row_class = type('lolita', (DataRow,), dict(title='lolita'))
+        row = row_class(StubDataSet)
+        row.title = 'Lolita'
+        row.year = 1955
+        eq_(list(row.columns()), ['title'])
+
 
 class TestDataTypeDrivenDataSet(TestDataSet):
     def setUp(self):
@@ -474,3 +516,237 @@ def test_DataSet_cant_add_refs_to_self():
     # will also create an infinite loop :
     ds = Pals()
     eq_(ds.meta.references, [])
+
+
+class TestDataSetStore(object):
+    def setUp(self):
+        class Stored(object):
+            def __init__(self, id):
+                self.id = id
+        self.store = DataSetStore(Books())
+        self.objects = [Stored(1), Stored(2)]
+        self.store.store('lolita', self.objects[0])
+        self.store.store('pi', self.objects[1])
+        self.calls = []
+    
+    def primary_key(self, obj):
+        self.calls.append(obj)
+        return (obj.id,)
+    
+    @attr(unit=True)
+    def test_keys_in_stored_order(self):
+        eq_(self.store.keys(), ['lolita', 'pi'])
+        self.store.store('animal_farm', self.objects[0].__class__(3))
+        eq_(self.store.keys(), ['lolita', 'pi', 'animal_farm'])
+    
+    @attr(unit=True)
+    def test_primary_keys_are_indexed_once(self):
+        eq_(self.store.primary_keys(self.primary_key), [(1,), (2,)])
+        eq_(len(self.calls), 2)
+        
+        self.store.store('new', self.objects[0].__class__(3))
+        eq_(self.store.primary_keys(self.primary_key), [(1,), (2,), (3,)])
+        eq_(len(self.calls), 3)
+        
+        # another callable starts over
+        eq_(self.store.primary_keys(lambda obj: (obj.id * 10,)), 
+            [(10,), (20,), (30,)])
+
+class TestCompiledSchema(object):
+    @attr(unit=True)
+    def test_rows_and_references_are_compiled(self):
+        schema = OfferData._schema
+        eq_([key for key, row, columns in schema],
+            ['discounted_spaceship', 'free_truck'])
+        columns = dict((key, columns) for key, row, columns in schema)
+        eq_([name for name, val, refs in columns['free_truck']],
+            ['category_id', 'id', 'name', 'product_id'])
+        spaceship = dict((name, refs) for name, val, refs
+                         in columns['discounted_spaceship'])
+        eq_(spaceship['name'], ())
+        eq_(spaceship['product_id'], (ProductData,))
+        eq_(spaceship['category_id'], (CategoryData,))
+        assert 'ref' not in spaceship
+
+    @attr(unit=True)
+    def test_changed_values_are_seen(self):
+        class Cats(DataSet):
+            class felix:
+                name = 'Felix'
+        Cats.felix.name = 'Tom'
+        eq_(Cats().felix.name, 'Tom')
+        Cats.felix.name = Authors.martel
+        eq_(Cats().meta.references, [Authors])
+
+    @attr(unit=True)
+    def test_rows_added_later_are_seen(self):
+        class Cats(DataSet):
+            class felix:
+                name = 'Felix'
+        Cats()
+        class tom:
+            name = 'Tom'
+        Cats.tom = tom
+        eq_(Cats().meta.keys, ['felix', 'tom'])
+        del Cats.tom
+        eq_(Cats().meta.keys, ['felix'])
+
+    @attr(unit=True)
+    def test_columns_added_later_are_seen(self):
+        class Cats(DataSet):
+            class felix:
+                name = 'Felix'
+            class kitten(felix):
+                name = 'Kitty'
+        Cats()
+        Cats.felix.owner = Authors.martel
+        cats = Cats()
+        eq_(list(cats.felix.columns()), ['name', 'owner'])
+        # inherited by another row:
+        eq_(list(cats.kitten.columns()), ['name', 'owner'])
+        eq_(cats.meta.references, [Authors])
+
+    @attr(unit=True)
+    def test_invalid_columns_raise_on_instantiation(self):
+        class Cats(DataSet):
+            class felix:
+                toys = [object()]
+        try:
+            Cats()
+        except TypeError:
+            pass
+        else:
+            assert False, "expected TypeError"
+
+
+class TestCompactRows(object):
+    def setUp(self):
+        class CompactAuthors(DataSet):
+            class Meta:
+                compact = True
+            class martel:
+                name = 'Yann Martel'
+            class nabokov:
+                name = 'Vladimir Nabokov'
+            class bellow:
+                name = 'Saul Bellow'
+                prizes = ['nobel']
+        self.CompactAuthors = CompactAuthors
+        self.authors = CompactAuthors()
+
+    @attr(unit=True)
+    def test_access(self):
+        eq_(self.authors.martel.name, 'Yann Martel')
+        eq_(self.authors['nabokov']['name'], 'Vladimir Nabokov')
+        eq_(self.authors.bellow.prizes, ['nobel'])
+        eq_(list(self.authors.bellow.columns()), ['name', 'prizes'])
+
+    @attr(unit=True)
+    def test_rows_with_the_same_columns_share_a_class(self):
+        from fixture.dataset.dataset import CompactDataRow
+        martel, nabokov = self.authors.martel, self.authors.nabokov
+        assert isinstance(martel, CompactDataRow)
+        assert martel.__class__ is nabokov.__class__
+        assert self.authors.bellow.__class__ is not martel.__class__
+        assert not hasattr(martel, '__dict__')
+
+    @attr(unit=True)
+    def test_columns_can_be_replaced_but_not_added(self):
+        row = self.authors.martel
+        row.name = 'Y. Martel'
+        eq_(row.name, 'Y. Martel')
+        try:
+            row.age = 55
+        except AttributeError:
+            pass
+        else:
+            assert False, "expected AttributeError"
+
+    @attr(unit=True)
+    def test_undefined_attributes_come_from_the_stored_object(self):
+        class StoredAuthor(object):
+            id = 7
+        self.authors.meta._stored_objects.store('martel', StoredAuthor())
+        eq_(self.authors.martel.id, 7)
+
+class TestColumnarDataSet(object):
+    def setUp(self):
+        class Countries(ColumnarDataSet):
+            columns = ('code', 'name')
+            rows = [
+                ('fr', 'France'),
+                ('nz', 'New Zealand'),
+            ]
+        class Cities(ColumnarDataSet):
+            key_column = 'label'
+            store_key = False
+            columns = ('label', 'name', 'country')
+            rows = [
+                ('wlg', 'Wellington', Countries.row('nz')),
+                ('lyo', 'Lyon', Countries.row('fr')),
+            ]
+        self.Countries = Countries
+        self.Cities = Cities
+
+    @attr(unit=True)
+    def test_access(self):
+        countries = self.Countries()
+        eq_(countries.meta.keys, ['fr', 'nz'])
+        eq_(countries.nz.name, 'New Zealand')
+        eq_(countries['fr']['code'], 'fr')
+        eq_(list(countries.nz.columns()), ['code', 'name'])
+
+    @attr(unit=True)
+    def test_rows_share_a_class(self):
+        countries = self.Countries()
+        assert countries.fr.__class__ is countries.nz.__class__
+
+    @attr(unit=True)
+    def test_key_column_can_be_left_out(self):
+        cities = self.Cities()
+        eq_(cities.meta.keys, ['wlg', 'lyo'])
+        eq_(list(cities.wlg.columns()), ['name', 'country'])
+
+    @attr(unit=True)
+    def test_references(self):
+        cities = self.Cities()
+        eq_(cities.meta.references, [self.Countries])
+        assert cities.wlg.country is self.Countries.row('nz')
+        ref = self.Countries.row('nz').ref
+        eq_(ref.dataset_class, self.Countries)
+        eq_(ref.key, 'nz')
+
+    @attr(unit=True)
+    def test_row_keys_are_strings(self):
+        class Numbers(ColumnarDataSet):
+            columns = ('id', 'name')
+            rows = [(1, 'one'), (2, 'two')]
+        assert Numbers.row(1) is Numbers.row('1')
+        eq_(Numbers.row(2).ref.key, '2')
+        eq_(Numbers().meta.keys, ['1', '2'])
+
+    @attr(unit=True)
+    def test_numpy_structured_array(self):
+        if not env_supports.numpy:
+            raise SkipTest("numpy is not installed")
+        import numpy
+        class Countries(ColumnarDataSet):
+            key_column = 'code'
+            rows = numpy.array(
+                [('New Zealand', 'nz', 5), ('France', 'fr', 67)],
+                dtype=[('name', 'U20'), ('code', 'U2'), ('people', 'i4')])
+        countries = Countries()
+        eq_(countries.meta.keys, ['nz', 'fr'])
+        # the columns are in the order of the fields:
+        eq_(list(countries.fr.columns()), ['name', 'code', 'people'])
+        eq_(countries.fr.people, 67)
+        eq_(type(countries.fr.people), int)
+        eq_(countries['nz'].name, 'New Zealand')
+
+    @attr(unit=True)
+    @raises(ValueError)
+    def test_rows_must_match_columns(self):
+        class Broken(ColumnarDataSet):
+            columns = ('code', 'name')
+            rows = [('fr',)]
+        Broken()
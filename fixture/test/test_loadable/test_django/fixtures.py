@@ -67,3 +67,43 @@ class DjangoDataSetWithMeta(DataSet):
     class guido:
         first_name = "Guido"
         last_name = "Van rossum"
+
+
+class NumberedAuthorData(DataSet):
+    class Meta:
+        django_model = 'app.Author'
+
+    class frank_herbert:
+        id = 1
+        first_name = "Frank"
+        last_name = "Herbert"
+
+    class guido:
+        id = 2
+        first_name = "Guido"
+        last_name = "Van rossum"
+
+
+class NumberedBookData(DataSet):
+    class Meta:
+        django_model = 'app.Book'
+
+    class dune:
+        id = 1
+        title = "Dune"
+        author = NumberedAuthorData.frank_herbert
+
+    class python:
+        id = 2
+        title = 'Python'
+        author = NumberedAuthorData.guido
+
+
+class NumberedReviewerData(DataSet):
+    class Meta:
+        django_model = 'app.Reviewer'
+
+    class ben:
+        id = 1
+        name = 'ben'
+        reviewed = [NumberedBookData.dune, NumberedBookData.python]
@@ -2,7 +2,7 @@ from datetime import datetime
 
 from django.db import models as django_models
 from fixture import DjangoFixture
-from fixture.loadable.django_loadable import field_is_required
+from fixture.loadable.django_loadable import ModelSchema, field_is_required
 from fixture.test.test_loadable.test_django.fixtures import \
     InvalidNoRelationsData
 from fixture.test.test_loadable.test_django.fixtures import ValidNoRelationsData
@@ -40,6 +40,26 @@ def test_schema_conformance():
             yield callable, djm, row[1]
 
 
+def test_schema_is_cached_per_model():
+    class CachedSchema(django_models.Model):
+        char = django_models.CharField(max_length=10)
+        num = django_models.IntegerField(null=True)
+
+        class Meta:
+            app_label = 'tests'
+
+    schema = ModelSchema.for_model(CachedSchema)
+    assert ModelSchema.for_model(CachedSchema) is schema
+    assert schema.required_field_names == set(['char'])
+    assert schema.field_names == set(['id', 'char', 'num'])
+
+    djm = DjangoFixture.Medium(CachedSchema, ValidNoRelationsData())
+    djm._check_schema([('char', 'one'), ('num', 1)])
+    assert ('char', 'num') in schema.checked_shapes
+    raises(ValueError)(djm._check_schema)([('num', 1)])
+    assert ('num',) not in schema.checked_shapes
+
+
 def test_is_field_required():
     from django.db import models
     class TestMod(models.Model):
@@ -2,9 +2,12 @@ from app.models import Author, Book, Reviewer
 from fixture import DjangoFixture
 from fixture.test.test_loadable.test_django.util import assert_empty
 from fixture.test.test_loadable.test_django.fixtures import DjangoDataSetWithMeta, AuthorData, BookData, ReviewerData
+from fixture.test.test_loadable.test_django.fixtures import NumberedAuthorData, NumberedBookData, NumberedReviewerData
+from nose.tools import raises
 
 
 dj_fixture = DjangoFixture()
+bulk_fixture = DjangoFixture(bulk_create=True)
 
 
 def test_fk_rels():
@@ -47,3 +50,103 @@ def test_dataset_with_meta():
     finally:
         data.teardown()
     assert_empty('app')
+
+
+def test_bulk_create():
+    assert_empty('app')
+    data = bulk_fixture.data(AuthorData, BookData, ReviewerData)
+    try:
+        data.setup()
+        frank = Author.objects.get(first_name='Frank')
+        assert data.AuthorData.frank_herbert.id == frank.id
+        assert frank.books.count() == 1
+        ben = Reviewer.objects.all()[0]
+        assert ben.reviewed.count() == 2
+        dune = Book.objects.get(title='Dune')
+        assert ben in dune.reviewers.all()
+    finally:
+        data.teardown()
+    assert_empty('app')
+
+
+def test_bulk_create_with_declared_keys():
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+    assert_empty('app')
+    # the query log is bounded; make room so none of ours are dropped
+    reset_queries()
+    data = bulk_fixture.data(NumberedAuthorData, NumberedBookData,
+                             NumberedReviewerData)
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            data.setup()
+        inserts = [q['sql'] for q in queries.captured_queries
+                   if 'INSERT INTO' in q['sql']]
+        # one for each table, including the through table of reviewed:
+        assert len(inserts) == 4, inserts
+        ben = Reviewer.objects.get(pk=1)
+        assert sorted([b.title for b in ben.reviewed.all()]) == \
+            ['Dune', 'Python']
+        assert Book.objects.get(pk=2).author.first_name == 'Guido'
+    finally:
+        data.teardown()
+    assert_empty('app')
+
+
+def test_bulk_create_uses_the_model_schema():
+    assert_empty('app')
+    data = bulk_fixture.data(NumberedAuthorData, NumberedBookData,
+                             NumberedReviewerData)
+    meta = Reviewer._meta
+
+    def get_field(*args, **kw):
+        raise AssertionError("m2m fields should come from ModelSchema")
+    meta.get_field = get_field
+    try:
+        try:
+            data.setup()
+        finally:
+            del meta.get_field
+        ben = Reviewer.objects.get(pk=1)
+        assert ben.reviewed.count() == 2
+    finally:
+        data.teardown()
+    assert_empty('app')
+
+
+def test_bulk_unload():
+    for strategy in ('delete', 'raw'):
+        assert_empty('app')
+        fixture = DjangoFixture(unload_strategy=strategy)
+        data = fixture.data(AuthorData, BookData, ReviewerData)
+        data.setup()
+        try:
+            assert Reviewer.objects.all()[0].reviewed.count() == 2
+        finally:
+            data.teardown()
+        assert_empty('app')
+        assert Reviewer.reviewed.through.objects.count() == 0
+
+
+def test_raw_unload_skips_signals():
+    from django.db.models.signals import pre_delete
+    deleted = []
+
+    def on_delete(sender, instance, **kw):
+        deleted.append(instance)
+    assert_empty('app')
+    fixture = DjangoFixture(unload_strategy='raw')
+    data = fixture.data(AuthorData, BookData, ReviewerData)
+    data.setup()
+    pre_delete.connect(on_delete)
+    try:
+        data.teardown()
+    finally:
+        pre_delete.disconnect(on_delete)
+    assert_empty('app')
+    assert deleted == [], deleted
+
+
+@raises(ValueError)
+def test_unknown_unload_strategy():
+    DjangoFixture(unload_strategy='drop')
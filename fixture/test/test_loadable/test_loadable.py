@@ -1,4 +1,4 @@
-from fixture import DataSet, NamedDataStyle
+from fixture import DataSet, ColumnarDataSet, NamedDataStyle
 from fixture import TempIO
 from fixture.loadable import (
     LoadableFixture, EnvLoadableFixture, DBLoadableFixture)
@@ -66,6 +66,39 @@ class LoadableTest(object):
         
         inspector.assert_data_torndown()
     
+    def test_read_only_DataTestCase(self):
+        from fixture import DataTestCase
+        import unittest
+        inspector = self
+        class ns:
+            data = []
+        
+        class SomeReadOnlyTestCase(DataTestCase, unittest.TestCase):
+            fixture = inspector.fixture
+            datasets = inspector.datasets()
+            read_only = True
+            def test_first(self):
+                ns.data.append(self.data)
+                inspector.assert_data_loaded(self.data)
+            def test_second(self):
+                ns.data.append(self.data)
+                inspector.assert_data_loaded(self.data)
+        
+        res = PrudentTestResult()
+        loader = unittest.TestLoader()
+        suite = loader.loadTestsFromTestCase(SomeReadOnlyTestCase)
+        suite(res)
+        
+        eq_(res.failures, [])
+        eq_(res.errors, [])
+        eq_(res.testsRun, 2)
+        eq_(len(ns.data), 2)
+        assert ns.data[0] is ns.data[1], (
+            "expected both tests to share one data object")
+        eq_(ns.data[0].users, 0)
+        
+        inspector.assert_data_torndown()
+    
     def test_with_data(self):
         import nose
 
@@ -301,6 +334,12 @@ class MockStorageMedium(DBLoadableFixture.StorageMediumAdapter):
         obj.save()
         return obj
 
+class MockBatchStorageMedium(MockStorageMedium):
+    batches = []
+    def save_batch(self, batch):
+        self.batches.append((self.medium, [row._key for row, vals in batch]))
+        return MockStorageMedium.save_batch(self, batch)
+
 class TestDBLoadableRowReferences(object):
     @attr(unit=True)
     def test_row_column_refs_are_resolved(self):
@@ -429,4 +468,381 @@ class TestDBLoadableRowReferences(object):
             ldr.loaded[PersonData].meta._stored_objects.get_object('bob')
         jenny_db_obj = \
             ldr.loaded[PersonData].meta._stored_objects.get_object('jenny')
-        eq_(jenny_db_obj.friend, bob_db_obj)
\ No newline at end of file
+        eq_(jenny_db_obj.friend, bob_db_obj)
+
+
+class TestBatchLoading(object):
+    def setUp(self):
+        MockBatchStorageMedium.batches = []
+    
+    @attr(unit=True)
+    def test_rows_are_saved_in_one_batch(self):
+        class MockDataObject(object):
+            def save(self): 
+                pass
+        class Person(MockDataObject):
+            pass
+        class Pet(MockDataObject):
+            pass
+        class PersonData(DataSet):
+            class bob:
+                name = "Bob B. Chillingsworth"
+            class stacy:
+                name = "Stacy Chillingsworth"
+        class PetData(DataSet):
+            class fido:
+                owner = PersonData.bob
+            class rex:
+                owner_name = PersonData.stacy.ref('name')
+            
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockBatchStorageMedium, 
+            env=locals(), batch=True)
+        ldr.begin()
+        ldr.load_dataset(PetData())
+        
+        eq_(MockBatchStorageMedium.batches, [
+            (Person, ['bob', 'stacy']), 
+            (Pet, ['fido', 'rex'])])
+        
+        bob_db_obj = \
+            ldr.loaded[PersonData].meta._stored_objects.get_object('bob')
+        fido_db_obj = \
+            ldr.loaded[PetData].meta._stored_objects.get_object('fido')
+        rex_db_obj = \
+            ldr.loaded[PetData].meta._stored_objects.get_object('rex')
+        eq_(fido_db_obj.owner, bob_db_obj)
+        eq_(rex_db_obj.owner_name, PersonData.stacy.name)
+    
+    @attr(unit=True)
+    def test_referencing_own_dataset_starts_a_new_batch(self):
+        class Person(object):
+            def save(self): 
+                pass
+        class PersonData(DataSet):
+            class bob:
+                name = "Bob B. Chillingsworth"
+                friend = None
+            class jenny:
+                name = "Jenny Ginetti"
+            jenny.friend = bob
+            class zed:
+                name = "Zed"
+            
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockBatchStorageMedium, 
+            env=locals(), batch=True)
+        ldr.begin()
+        ldr.load_dataset(PersonData())
+        
+        eq_(MockBatchStorageMedium.batches, [
+            (Person, ['bob']), 
+            (Person, ['jenny', 'zed'])])
+        
+        bob_db_obj = \
+            ldr.loaded[PersonData].meta._stored_objects.get_object('bob')
+        jenny_db_obj = \
+            ldr.loaded[PersonData].meta._stored_objects.get_object('jenny')
+        eq_(jenny_db_obj.friend, bob_db_obj)
+
+class TestLoadPlan(object):
+    def datasets(self):
+        class ContinentData(DataSet):
+            class europe:
+                name = "Europe"
+        class CountryData(DataSet):
+            class france:
+                continent = ContinentData.europe
+        class CityData(DataSet):
+            class paris:
+                country = CountryData.france
+        class TripData(DataSet):
+            class spring:
+                city = CityData.paris
+                continent = ContinentData.europe
+        return ContinentData, CountryData, CityData, TripData
+    
+    @attr(unit=True)
+    def test_datasets_are_planned_after_their_references(self):
+        from fixture.loadable.loadable import LoadPlan
+        ContinentData, CountryData, CityData, TripData = self.datasets()
+        plan = LoadPlan([TripData()])
+        eq_(list(plan), [
+            (ContinentData, 4), (CountryData, 3), (CityData, 2), 
+            (TripData, 1)])
+    
+    @attr(unit=True)
+    def test_independent_datasets_share_a_stage(self):
+        from fixture.loadable.loadable import LoadPlan
+        ContinentData, CountryData, CityData, TripData = self.datasets()
+        class CurrencyData(DataSet):
+            class euro:
+                name = "Euro"
+        plan = LoadPlan([TripData(), CurrencyData()])
+        eq_(plan.stages(), [
+            [(ContinentData, 4), (CurrencyData, 1)], 
+            [(CountryData, 3)], [(CityData, 2)], [(TripData, 1)]])
+    
+    @attr(unit=True)
+    def test_columns_read_by_ref_values(self):
+        from fixture.loadable.loadable import LoadPlan
+        ContinentData, CountryData, CityData, TripData = self.datasets()
+        class TicketData(DataSet):
+            class spring_ticket:
+                trip = TripData.spring
+                city_name = CityData.paris.ref('name')
+                continent_name = ContinentData.europe.ref('name')
+        plan = LoadPlan([TicketData()])
+        eq_(plan.columns_read[TicketData], 
+            set([(CityData, 'name'), (ContinentData, 'name')]))
+        eq_(plan.columns_read[TripData], set())
+    
+    @attr(unit=True)
+    def test_plans_are_reused(self):
+        ContinentData, CountryData, CityData, TripData = self.datasets()
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockStorageMedium, env={})
+        plan = ldr.plan_load([TripData()])
+        assert ldr.plan_load([TripData()]) is plan
+        assert ldr.plan_load([CityData()]) is not plan
+    
+    @attr(unit=True)
+    def test_unload_order_follows_plan_levels(self):
+        class MockDataObject(object):
+            def save(self): 
+                pass
+        class Continent(MockDataObject): pass
+        class Country(MockDataObject): pass
+        class City(MockDataObject): pass
+        class Trip(MockDataObject): pass
+        ContinentData, CountryData, CityData, TripData = self.datasets()
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockStorageMedium, env=locals())
+        ldr.begin()
+        ldr.load_dataset(TripData())
+        eq_([ds.__class__ for ds in ldr.loaded.to_unload()], 
+            [TripData, CityData, CountryData, ContinentData])
+
+class MockClearableStorageMedium(MockBatchStorageMedium):
+    def clear(self, obj):
+        pass
+
+class TestLoadReport(object):
+    def datasets(self):
+        class MockDataObject(object):
+            def save(self): 
+                pass
+        class Person(MockDataObject):
+            pass
+        class Pet(MockDataObject):
+            pass
+        class PersonData(DataSet):
+            class bob:
+                name = "Bob B. Chillingsworth"
+            class stacy:
+                name = "Stacy Chillingsworth"
+        class PetData(DataSet):
+            class fido:
+                owner = PersonData.bob
+        return locals()
+    
+    def load_and_unload(self, **kw):
+        from fixture.loadable.loadable import LoadReport
+        env = self.datasets()
+        report = LoadReport()
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockClearableStorageMedium, 
+            env=env, report=report, **kw)
+        data = ldr.data(env['PetData'])
+        data.setup()
+        data.teardown()
+        return report, env
+    
+    @attr(unit=True)
+    def test_loads_and_unloads_are_timed(self):
+        report, env = self.load_and_unload()
+        eq_([t.unloading for t in report.timings], [False, True])
+        load, unload = report.timings
+        assert load.wall_time > 0
+        assert load.resolve_time > 0
+        assert load.commit_time > 0
+        eq_(sorted(load.datasets.keys(), key=lambda c: c.__name__), 
+            [env['PersonData'], env['PetData']])
+        person = load.datasets[env['PersonData']]
+        eq_((person.loads, person.rows, person.save_calls), (1, 2, 2))
+        person = unload.datasets[env['PersonData']]
+        eq_((person.unloads, person.clear_calls), (1, 2))
+    
+    @attr(unit=True)
+    def test_batches_count_as_one_save(self):
+        report, env = self.load_and_unload(batch=True)
+        person = report.datasets()[env['PersonData']]
+        eq_((person.loads, person.unloads), (1, 1))
+        eq_((person.rows, person.save_calls, person.clear_calls), (2, 1, 2))
+    
+    @attr(unit=True)
+    def test_slowest_datasets_are_reported(self):
+        report, env = self.load_and_unload()
+        slowest = report.slowest(count=1)
+        eq_(len(slowest), 1)
+        assert slowest[0].dataset_class in (env['PersonData'], env['PetData'])
+        assert slowest[0].dataset_class.__name__ in report.format()
+
+class TestCompactRowLoading(object):
+    def load(self, **kw):
+        calls = []
+        class MockDataObject(object):
+            def save(self):
+                calls.append(self)
+        class Person(MockDataObject):
+            name = None
+        class Pet(MockDataObject):
+            owner = None
+        class PersonData(DataSet):
+            class Meta:
+                compact = True
+            class bob:
+                name = "Bob B. Chillingsworth"
+        class PetData(DataSet):
+            class Meta:
+                compact = True
+            class fido:
+                owner = PersonData.bob
+                owner_name = PersonData.bob.ref('name')
+            
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockBatchStorageMedium, 
+            env=locals(), **kw)
+        ldr.begin()
+        ldr.load_dataset(PetData())
+        return ldr, PersonData, PetData
+    
+    @attr(unit=True)
+    def test_compact_rows_are_loaded(self):
+        ldr, PersonData, PetData = self.load()
+        bob = ldr.loaded[PersonData].meta._stored_objects.get_object('bob')
+        fido = ldr.loaded[PetData].meta._stored_objects.get_object('fido')
+        eq_(fido.owner, bob)
+        eq_(fido.owner_name, "Bob B. Chillingsworth")
+        eq_(ldr.loaded[PetData].fido.owner_name, "Bob B. Chillingsworth")
+    
+    @attr(unit=True)
+    def test_compact_rows_are_loaded_in_batch(self):
+        ldr, PersonData, PetData = self.load(batch=True)
+        bob = ldr.loaded[PersonData].meta._stored_objects.get_object('bob')
+        fido = ldr.loaded[PetData].meta._stored_objects.get_object('fido')
+        eq_(fido.owner, bob)
+
+class TestColumnarLoading(object):
+    def load(self, **kw):
+        class MockDataObject(object):
+            def save(self):
+                pass
+        class Person(MockDataObject):
+            name = None
+        class Pet(MockDataObject):
+            owner = None
+        class PersonData(ColumnarDataSet):
+            columns = ('key', 'name')
+            store_key = False
+            rows = [
+                ('bob', "Bob B. Chillingsworth"),
+                ('betty', "Betty Boo"),
+            ]
+        class PetData(ColumnarDataSet):
+            columns = ('key', 'owner', 'owner_name')
+            store_key = False
+            rows = [
+                ('fido', PersonData.row('bob'), 
+                         PersonData.row('bob').ref('name')),
+                ('rex', PersonData.row('betty'), 
+                        PersonData.row('betty').ref('name')),
+            ]
+        
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockBatchStorageMedium, 
+            env=locals(), **kw)
+        ldr.begin()
+        ldr.load_dataset(PetData())
+        return ldr, PersonData, PetData
+    
+    def check_loaded(self, ldr, PersonData, PetData):
+        people = ldr.loaded[PersonData].meta._stored_objects
+        pets = ldr.loaded[PetData].meta._stored_objects
+        eq_(pets.get_object('fido').owner, people.get_object('bob'))
+        eq_(pets.get_object('rex').owner, people.get_object('betty'))
+        eq_(pets.get_object('rex').owner_name, "Betty Boo")
+        assert not hasattr(pets.get_object('rex'), 'key')
+        eq_(ldr.loaded[PetData].fido.owner_name, "Bob B. Chillingsworth")
+    
+    @attr(unit=True)
+    def test_columnar_rows_are_loaded(self):
+        self.check_loaded(*self.load())
+    
+    @attr(unit=True)
+    def test_columnar_rows_are_loaded_in_batch(self):
+        self.check_loaded(*self.load(batch=True))
+
+class TestFileDataSetLoading(object):
+    def setUp(self):
+        self.tmp = TempIO()
+        self.tmp.putfile('people.csv', 
+                "key,name\nbob,Bob B. Chillingsworth\nbetty,Betty Boo\n"
+                "bill,Bill\n")
+        del MockBatchStorageMedium.batches[:]
+    
+    def tearDown(self):
+        del self.tmp
+    
+    @attr(unit=True)
+    def test_file_rows_are_streamed_in_batches(self):
+        from fixture.dataset.converter import CSVDataSet
+        class MockDataObject(object):
+            def save(self):
+                pass
+        class Person(MockDataObject):
+            name = None
+        class Pet(MockDataObject):
+            owner = None
+        class PersonData(CSVDataSet):
+            class Meta:
+                batch_size = 2
+            filename = self.tmp.join('people.csv')
+            store_key = False
+        class PetData(DataSet):
+            class fido:
+                owner = PersonData.row('betty')
+                owner_name = PersonData.row('betty').ref('name')
+        
+        ldr = StubLoadableFixture(
+            style=NamedDataStyle(), medium=MockBatchStorageMedium, 
+            env=locals(), batch=True)
+        ldr.begin()
+        ldr.load_dataset(PetData())
+        people = ldr.loaded[PersonData]
+        eq_(MockBatchStorageMedium.batches[:2], [
+            (Person, ['bob', 'betty']), (Person, ['bill'])])
+        eq_(people.meta.keys, [])
+        eq_(people.meta._stored_objects.keys(), ['bob', 'betty', 'bill'])
+        fido = ldr.loaded[PetData].meta._stored_objects.get_object('fido')
+        eq_(fido.owner, people.meta._stored_objects.get_object('betty'))
+        eq_(fido.owner_name, "Betty Boo")
+    
+    @attr(unit=True)
+    def test_planning_does_not_read_the_file(self):
+        from fixture.dataset.converter import CSVDataSet
+        from fixture.loadable.loadable import LoadPlan
+        reads = []
+        class PersonData(CSVDataSet):
+            filename = self.tmp.join('people.csv')
+            def lines(self):
+                reads.append(self.filename)
+                return CSVDataSet.lines(self)
+        class PetData(CSVDataSet):
+            class Meta:
+                references = [PersonData]
+            filename = self.tmp.join('people.csv')
+        plan = LoadPlan([PetData()])
+        eq_(reads, [])
+        eq_(plan.columns_read[PetData], set([(PersonData, None)]))
+        eq_(plan.columns_read[PersonData], set())
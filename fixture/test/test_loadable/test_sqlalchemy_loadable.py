@@ -489,6 +489,762 @@ class TestTableObjects(unittest.TestCase):
         clear_session(self.session)
         eq_(self.session.execute(categories.select()).fetchall(), [])
 
+class BatchCategoryData(DataSet):
+    class cars:
+        id = 1
+        name = 'cars'
+    class free_stuff:
+        id = 2
+        name = 'get free stuff'
+    class misc:
+        name = 'misc'
+
+class BatchProductData(DataSet):
+    class truck:
+        id = 1
+        name = 'truck'
+        category_id = BatchCategoryData.cars.ref('id')
+    class spaceship:
+        id = 2
+        name = 'spaceship'
+        category_id = BatchCategoryData.misc.ref('id')
+
+class TestTableObjectsInBatch(unittest.TestCase):
+    def setUp(self):
+        from sqlalchemy import event
+        self.engine = create_engine(conf.LITE_DSN)
+        metadata.bind = self.engine
+        metadata.create_all()
+        self.inserts = []
+        def count_inserts(conn, cursor, statement, parameters, context, 
+                                                                executemany):
+            if statement.startswith("INSERT"):
+                self.inserts.append((statement, executemany))
+        event.listen(self.engine, "before_cursor_execute", count_inserts)
+        self.fixture = SQLAlchemyFixture(
+            env={'BatchCategoryData': categories, 
+                 'BatchProductData': products},
+            engine=metadata.bind,
+            batch=True
+        )
+    
+    def tearDown(self):
+        metadata.drop_all()
+    
+    @attr(functional=1)
+    def test_rows_with_primary_keys_are_inserted_together(self):
+        data = self.fixture.data(BatchProductData)
+        data.setup()
+        try:
+            eq_(self.inserts, [
+                # cars and free_stuff:
+                ("INSERT INTO fixture_sqlalchemy_category (id, name) "
+                 "VALUES (?, ?)", True),
+                # misc needs its generated id:
+                ("INSERT INTO fixture_sqlalchemy_category (name) "
+                 "VALUES (?)", False),
+                ("INSERT INTO fixture_sqlalchemy_product "
+                 "(id, name, category_id) VALUES (?, ?, ?)", True)])
+            
+            eq_(data.BatchCategoryData.cars.id, 1)
+            eq_(data.BatchCategoryData.misc.name, 'misc')
+            prods = self.engine.execute(
+                        products.select().order_by(products.c.id)).fetchall()
+            eq_([(p.name, p.category_id) for p in prods], 
+                [('truck', 1), 
+                 ('spaceship', data.BatchCategoryData.misc.id)])
+        finally:
+            data.teardown()
+        eq_(self.engine.execute(categories.select()).fetchall(), [])
+
+class TestTableObjectsInsertReturning(unittest.TestCase):
+    
+    class StubRow(dict):
+        def __getattr__(self, name):
+            return self[name]
+    
+    class StubResult(object):
+        def __init__(self, rows, inserted_primary_key=None):
+            self.rows = rows
+            self.inserted_primary_key = inserted_primary_key
+        def fetchall(self):
+            return self.rows
+    
+    class StubConnection(object):
+        def __init__(self, returned):
+            from sqlalchemy.dialects import postgresql
+            self.dialect = postgresql.dialect()
+            # normally detected when connecting to PostgreSQL 8.2+
+            self.dialect.implicit_returning = True
+            self.returned = returned
+            self.statements = []
+        def execute(self, stmt, *params):
+            self.statements.append(str(stmt.compile(dialect=self.dialect)))
+            test = TestTableObjectsInsertReturning
+            returned = self.returned.pop(0)
+            return test.StubResult(
+                [test.StubRow(row) for row in returned], 
+                inserted_primary_key=[returned[0]['id']])
+    
+    def save_batch(self, rows, returned, chunk_size=None):
+        self.conn = self.StubConnection(returned)
+        medium = TableMedium(categories, CategoryData)
+        medium.conn = self.conn
+        if chunk_size:
+            medium.chunk_size = chunk_size
+        return medium.save_batch(rows)
+    
+    @attr(unit=1)
+    def test_supports_insert_returning(self):
+        from sqlalchemy.dialects import sqlite
+        eq_(supports_insert_returning(None), False)
+        eq_(supports_insert_returning(sqlite.dialect()), False)
+        eq_(supports_insert_returning(self.StubConnection([]).dialect), True)
+    
+    @attr(unit=1)
+    def test_rows_are_returned_from_one_statement(self):
+        # returned in another order than the VALUES:
+        stored = self.save_batch([
+            (CategoryData.cars, [('id', 5), ('name', 'cars')]), 
+            (CategoryData.free_stuff, [('id', '6'), 
+                                       ('name', 'get free stuff')])], 
+            [[{'id': 6, 'name': 'get free stuff'}, 
+              {'id': 5, 'name': 'cars'}]])
+        eq_(len(self.conn.statements), 1)
+        assert self.conn.statements[0].endswith(
+            "RETURNING fixture_sqlalchemy_category.id, "
+            "fixture_sqlalchemy_category.name"), self.conn.statements[0]
+        
+        eq_([r.inserted_key for r in stored], [[5], [6]])
+        eq_(stored[1].name, 'get free stuff')
+        # no select was needed to get a column:
+        eq_(len(self.conn.statements), 1)
+    
+    @attr(unit=1)
+    def test_statements_are_chunked(self):
+        stored = self.save_batch([
+            (CategoryData.cars, [('id', 5), ('name', 'cars')]), 
+            (CategoryData.free_stuff, [('id', 6), 
+                                       ('name', 'get free stuff')])], 
+            [[{'id': 5, 'name': 'cars'}], 
+             [{'id': 6, 'name': 'get free stuff'}]], chunk_size=1)
+        eq_(len(self.conn.statements), 2)
+        eq_([r.inserted_key for r in stored], [[5], [6]])
+    
+    @attr(unit=1)
+    def test_generated_keys_are_not_matched_by_position(self):
+        if sa_major >= 2.0:
+            raise SkipTest("rows are returned in parameter order")
+        stored = self.save_batch([
+            (CategoryData.cars, [('name', 'cars')]), 
+            (CategoryData.free_stuff, [('name', 'get free stuff')])], 
+            [[{'id': 5, 'name': 'cars'}], 
+             [{'id': 6, 'name': 'get free stuff'}]])
+        eq_(len(self.conn.statements), 2)
+        assert "RETURNING" not in self.conn.statements[0]
+        eq_([r.inserted_key for r in stored], [[5], [6]])
+
+class TestLoadedTableRows(unittest.TestCase):
+    
+    class CategoryData(DataSet):
+        class cars:
+            name = 'cars'
+        class free_stuff:
+            name = 'get free stuff'
+        class misc:
+            name = 'misc'
+    
+    class EditionData(DataSet):
+        class first:
+            book_id = 1
+            number = 1
+            name = 'first edition'
+        class second:
+            book_id = 1
+            number = 2
+            name = 'second edition'
+    
+    def setUp(self):
+        from sqlalchemy import event
+        self.engine = create_engine(conf.LITE_DSN)
+        self.meta = MetaData(bind=self.engine)
+        self.editions = Table("fixture_sqlalchemy_edition", self.meta,
+            Column("book_id", INT, primary_key=True, autoincrement=False),
+            Column("number", INT, primary_key=True, autoincrement=False),
+            Column("name", String(100)))
+        self.meta.create_all()
+        metadata.bind = self.engine
+        metadata.create_all()
+        self.selects = []
+        def count_selects(conn, cursor, statement, parameters, context, 
+                                                                executemany):
+            if statement.startswith("SELECT"):
+                self.selects.append(statement)
+        event.listen(self.engine, "before_cursor_execute", count_selects)
+        self.fixture = SQLAlchemyFixture(
+            env={'CategoryData': categories, 
+                 'EditionData': self.editions},
+            engine=self.engine)
+    
+    def tearDown(self):
+        metadata.drop_all()
+        self.meta.drop_all()
+    
+    @attr(functional=1)
+    def test_rows_are_selected_together(self):
+        data = self.fixture.data(self.CategoryData)
+        data.setup()
+        try:
+            eq_(self.selects, [])
+            stored = data.CategoryData.meta._stored_objects
+            eq_(stored.get_object('cars').name, 'cars')
+            eq_(len(self.selects), 1)
+            eq_(stored.get_object('free_stuff').name, 'get free stuff')
+            eq_(stored.get_object('misc').name, 'misc')
+            eq_(len(self.selects), 1)
+        finally:
+            data.teardown()
+    
+    @attr(functional=1)
+    def test_composite_primary_key(self):
+        data = self.fixture.data(self.EditionData)
+        data.setup()
+        try:
+            stored = data.EditionData.meta._stored_objects
+            eq_(stored.get_object('second').name, 'second edition')
+            eq_(stored.get_object('first').name, 'first edition')
+            eq_(len(self.selects), 1)
+        finally:
+            data.teardown()
+    
+    @attr(functional=1)
+    def test_unloaded_rows_are_not_selected(self):
+        data = self.fixture.data(self.CategoryData)
+        data.setup()
+        medium = data.CategoryData.meta.storage_medium
+        eq_(len(medium.loaded_rows), 3)
+        data.teardown()
+        eq_(medium.loaded_rows, [])
+        eq_(self.selects, [])
+    
+    @attr(unit=1)
+    def test_row_without_medium_selects_itself(self):
+        self.engine.execute(categories.insert(), {'id': 7, 'name': 'misc'})
+        row = LoadedTableRow(categories, [7], None)
+        eq_(row.name, 'misc')
+        eq_(len(self.selects), 1)
+
+class UnloadStrategyTest(object):
+    """tests an unload_strategy of SQLAlchemyFixture.
+    
+    mix this into a TestCase
+    """
+    unload_strategy = None
+    
+    def setUp(self):
+        from sqlalchemy import event
+        self.engine = create_engine(conf.LITE_DSN)
+        metadata.bind = self.engine
+        metadata.create_all()
+        self.deletes = []
+        def count_deletes(conn, cursor, statement, parameters, context, 
+                                                                executemany):
+            if statement.startswith("DELETE"):
+                self.deletes.append(statement)
+        event.listen(self.engine, "before_cursor_execute", count_deletes)
+        clear_mappers()
+        mapper(Category, categories)
+        mapper(Product, products, properties={
+            'category': relation(Category)
+        })
+        # a row not inserted by the fixture:
+        self.engine.execute(categories.insert(), {'id': 99, 'name': 'other'})
+        
+    def tearDown(self):
+        metadata.drop_all()
+        clear_mappers()
+    
+    def load_and_unload(self, env):
+        from fixture.loadable.loadable import LoadReport
+        report = LoadReport()
+        fixture = SQLAlchemyFixture(
+            env=env, engine=self.engine, 
+            unload_strategy=self.unload_strategy, report=report)
+        data = fixture.data(BatchProductData)
+        data.setup()
+        eq_(len(self.engine.execute(categories.select()).fetchall()), 4)
+        eq_(len(self.engine.execute(products.select()).fetchall()), 2)
+        data.teardown()
+        eq_(self.engine.execute(products.select()).fetchall(), [])
+        eq_([t.unloading for t in report.timings], [False, True])
+        unloaded = report.timings[1].datasets
+        eq_(sorted([(c.__name__, t.unloads) for c, t in unloaded.items()]), 
+            [('BatchCategoryData', 1), ('BatchProductData', 1)])
+    
+    def assert_unloaded(self):
+        raise NotImplementedError
+    
+    @attr(functional=1)
+    def test_table_objects(self):
+        self.load_and_unload({'BatchCategoryData': categories, 
+                              'BatchProductData': products})
+        self.assert_unloaded()
+    
+    @attr(functional=1)
+    def test_mapped_classes(self):
+        self.load_and_unload({'BatchCategoryData': Category, 
+                              'BatchProductData': Product})
+        self.assert_unloaded()
+    
+    @attr(functional=1)
+    def test_nothing_loaded(self):
+        from fixture.loadable.loadable import LoadReport
+        report = LoadReport()
+        fixture = SQLAlchemyFixture(
+            env={}, engine=self.engine, 
+            unload_strategy=self.unload_strategy, report=report)
+        data = fixture.data()
+        data.setup()
+        data.teardown()
+        eq_(self.deletes, [])
+        eq_([t.unloading for t in report.timings], [False, True])
+        eq_(report.timings[1].datasets, {})
+        
+class TestBulkDeleteUnload(UnloadStrategyTest, unittest.TestCase):
+    unload_strategy = 'delete'
+    
+    def assert_unloaded(self):
+        eq_([d.split(" WHERE ")[0] for d in self.deletes], [
+            "DELETE FROM fixture_sqlalchemy_product", 
+            "DELETE FROM fixture_sqlalchemy_category"])
+        eq_([(c.id, c.name) for c in 
+                self.engine.execute(categories.select()).fetchall()], 
+            [(99, 'other')])
+        
+class TestTruncateUnload(UnloadStrategyTest, unittest.TestCase):
+    unload_strategy = 'truncate'
+    
+    def assert_unloaded(self):
+        eq_(self.deletes, [
+            "DELETE FROM fixture_sqlalchemy_product", 
+            "DELETE FROM fixture_sqlalchemy_category"])
+        eq_(self.engine.execute(categories.select()).fetchall(), [])
+
+class TestRollbackUnload(unittest.TestCase):
+    
+    def setUp(self):
+        from sqlalchemy import event
+        from fixture.loadable.loadable import LoadReport
+        self.engine = create_engine(conf.LITE_DSN)
+        # let SQLAlchemy emit BEGIN so that pysqlite supports SAVEPOINT
+        @event.listens_for(self.engine, "connect")
+        def do_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+        @event.listens_for(self.engine, "begin")
+        def do_begin(conn):
+            conn.execute("BEGIN")
+        self.statements = []
+        def log_statements(conn, cursor, statement, parameters, context, 
+                                                                executemany):
+            self.statements.append(statement)
+        event.listen(self.engine, "before_cursor_execute", log_statements)
+        
+        metadata.bind = self.engine
+        metadata.create_all()
+        clear_mappers()
+        mapper(Category, categories)
+        mapper(Product, products, properties={
+            'category': relation(Category)
+        })
+        self.report = LoadReport()
+        self.fixture = SQLAlchemyFixture(
+            env={'CategoryData': Category, 'ProductData': Product}, 
+            engine=self.engine, unload_strategy='rollback', 
+            report=self.report)
+    
+    def tearDown(self):
+        self.fixture.dispose()
+        metadata.drop_all()
+        clear_mappers()
+    
+    @attr(functional=1)
+    def test_teardown_rolls_back_to_savepoint(self):
+        for attempt in range(2):
+            data = self.fixture.data(ProductData)
+            data.setup()
+            # the app uses the fixture's connection:
+            session = sessionmaker(bind=self.fixture.connection)()
+            eq_([c.name for c in 
+                    session.query(Category).order_by(Category.name)], 
+                ['cars', 'get free stuff'])
+            eq_([p.category.name for p in session.query(Product)], ['cars'])
+            session.close()
+            
+            del self.statements[:]
+            data.teardown()
+            eq_(len(self.statements), 1)
+            assert self.statements[0].startswith("ROLLBACK TO SAVEPOINT"), (
+                                                            self.statements)
+            
+            session = sessionmaker(bind=self.fixture.connection)()
+            eq_(session.query(Category).all(), [])
+            session.close()
+            
+            unload = self.report.timings[-1]
+            assert unload.unloading
+            eq_(sorted([(c.__name__, t.unloads) 
+                        for c, t in unload.datasets.items()]), 
+                [('CategoryData', 1), ('ProductData', 1)])
+    
+    @attr(unit=1)
+    @raises(UninitializedError)
+    def test_connection_is_required(self):
+        fixture = SQLAlchemyFixture(
+            env={'CategoryData': Category}, unload_strategy='rollback')
+        fixture.data(CategoryData).setup()
+
+class SnapshotTest(object):
+    """tests restoring DataSets loaded with use_snapshots=True
+    
+    mix this into a TestCase
+    """
+    env = None
+    
+    def setUp(self):
+        from sqlalchemy import event
+        self.engine = create_engine(conf.LITE_DSN)
+        metadata.bind = self.engine
+        metadata.create_all()
+        self.statements = []
+        def log_statements(conn, cursor, statement, parameters, context, 
+                                                                executemany):
+            self.statements.append((statement.split(" (")[0], executemany))
+        event.listen(self.engine, "before_cursor_execute", log_statements)
+        clear_mappers()
+        mapper(Category, categories)
+        mapper(Product, products, properties={
+            'category': relation(Category)
+        })
+        self.fixture = SQLAlchemyFixture(
+            env=self.env, engine=self.engine, use_snapshots=True)
+    
+    def tearDown(self):
+        metadata.drop_all()
+        clear_mappers()
+    
+    def assert_loaded(self, data):
+        raise NotImplementedError
+    
+    @attr(functional=1)
+    def test_second_load_is_restored(self):
+        data = self.fixture.data(BatchProductData)
+        data.setup()
+        self.assert_loaded(data)
+        data.teardown()
+        eq_(len(self.fixture.snapshot_cache), 1)
+        
+        del self.statements[:]
+        data = self.fixture.data(BatchProductData)
+        data.setup()
+        inserts = [s for s in self.statements if s[0].startswith("INSERT")]
+        eq_(inserts, [
+            ("INSERT INTO fixture_sqlalchemy_category", True),
+            ("INSERT INTO fixture_sqlalchemy_product", True)])
+        self.assert_loaded(data)
+        data.teardown()
+        eq_(self.engine.execute(categories.select()).fetchall(), [])
+        eq_(self.engine.execute(products.select()).fetchall(), [])
+    
+    @attr(functional=1)
+    def test_file_datasets_are_restored(self):
+        from fixture.dataset.converter import CSVDataSet
+        from fixture.io import TempIO
+        tmp = TempIO()
+        tmp.putfile('categories.csv', "id,name\n1,cars\n2,trucks\n")
+        class CsvCategoryData(CSVDataSet):
+            filename = tmp.join('categories.csv')
+        env = dict(self.env)
+        env['CsvCategoryData'] = env['BatchCategoryData']
+        fixture = SQLAlchemyFixture(
+            env=env, engine=self.engine, use_snapshots=True)
+        for attempt in range(2):
+            data = fixture.data(CsvCategoryData)
+            data.setup()
+            store = fixture.loaded[CsvCategoryData].meta._stored_objects
+            eq_(store.keys(), ['1', '2'])
+            eq_(store.get_object('2').name, 'trucks')
+            eq_(sorted([c.name for c in 
+                    self.engine.execute(categories.select()).fetchall()]), 
+                ['cars', 'trucks'])
+            data.teardown()
+            eq_(self.engine.execute(categories.select()).fetchall(), [])
+        eq_(len(fixture.snapshot_cache), 1)
+    
+    @attr(unit=1)
+    def test_changed_rows_are_not_restored(self):
+        from fixture.dataset import SuperSet
+        class CategoryData(DataSet):
+            class cars:
+                name = 'cars'
+        key = self.fixture.snapshot_key(SuperSet(CategoryData()))
+        eq_(key, self.fixture.snapshot_key(SuperSet(CategoryData())))
+        
+        CategoryData.cars.name = 'trucks'
+        assert key != self.fixture.snapshot_key(SuperSet(CategoryData()))
+
+class TestTableSnapshots(SnapshotTest, unittest.TestCase):
+    env = {'BatchCategoryData': categories, 'BatchProductData': products}
+    
+    def assert_loaded(self, data):
+        eq_(data.BatchCategoryData.misc.name, 'misc')
+        eq_(data.BatchProductData.spaceship.category_id, 
+            data.BatchCategoryData.misc.id)
+        eq_(len(self.engine.execute(products.select()).fetchall()), 2)
+
+class TestMappedClassSnapshots(SnapshotTest, unittest.TestCase):
+    env = {'BatchCategoryData': Category, 'BatchProductData': Product}
+    
+    def assert_loaded(self, data):
+        eq_(data.BatchCategoryData.cars.name, 'cars')
+        eq_(data.BatchProductData.truck.category_id, 1)
+        session = sessionmaker(bind=self.engine)()
+        eq_(sorted([c.name for c in session.query(Category)]), 
+            ['cars', 'get free stuff', 'misc'])
+        session.close()
+
+class BatchAuthorData(DataSet):
+    class frank:
+        id = 1
+        first_name = 'Frank'
+        last_name = 'Herbert'
+
+class BrokenProductData(DataSet):
+    class truck:
+        id = 1
+        name = 'truck'
+        category_id = BatchCategoryData.cars.ref('id')
+    class bus:
+        id = 1
+        name = 'bus'
+        category_id = BatchCategoryData.cars.ref('id')
+
+class LinkedProductData(DataSet):
+    class truck:
+        id = 1
+        name = 'truck'
+        category = BatchCategoryData.cars
+
+class OtherLinkedProductData(DataSet):
+    class van:
+        id = 2
+        name = 'van'
+        category = BatchCategoryData.cars
+
+class ParallelLoadTest(object):
+    """tests loading DataSets with parallel=2
+    
+    mix this into a TestCase
+    """
+    env = None
+    
+    def setUp(self):
+        if not conf.HEAVY_DSN:
+            raise SkipTest("conf.HEAVY_DSN not defined")
+        self.engine = create_engine(conf.HEAVY_DSN)
+        metadata.bind = self.engine
+        metadata.create_all()
+        clear_mappers()
+        mapper(Category, categories)
+        mapper(Product, products, properties={
+            'category': relation(Category)
+        })
+        mapper(Author, authors)
+        self.fixture = SQLAlchemyFixture(
+            env=self.env, engine=self.engine, parallel=2)
+    
+    def tearDown(self):
+        self.fixture.dispose()
+        metadata.drop_all()
+        clear_mappers()
+        self.engine.dispose()
+    
+    def assert_loaded(self, data):
+        raise NotImplementedError
+    
+    def count_rows(self, table):
+        return len(self.engine.execute(table.select()).fetchall())
+    
+    @attr(functional=1)
+    def test_setup_then_teardown(self):
+        data = self.fixture.data(BatchProductData, BatchAuthorData)
+        data.setup()
+        self.assert_loaded(data)
+        eq_(self.count_rows(categories), 3)
+        eq_(self.count_rows(products), 2)
+        eq_(self.count_rows(authors), 1)
+        data.teardown()
+        eq_(self.count_rows(categories), 0)
+        eq_(self.count_rows(products), 0)
+        eq_(self.count_rows(authors), 0)
+    
+    @attr(functional=1)
+    def test_committed_rows_are_unloaded_on_error(self):
+        data = self.fixture.data(BrokenProductData, BatchAuthorData)
+        raises(Exception)(data.setup)()
+        eq_(self.count_rows(categories), 0)
+        eq_(self.count_rows(products), 0)
+        eq_(self.count_rows(authors), 0)
+
+class TestParallelTableObjects(ParallelLoadTest, unittest.TestCase):
+    env = {'BatchCategoryData': categories, 'BatchProductData': products, 
+           'BatchAuthorData': authors, 'BrokenProductData': products}
+    
+    def assert_loaded(self, data):
+        eq_(data.BatchProductData.spaceship.category_id, 
+            data.BatchCategoryData.misc.id)
+        eq_(data.BatchAuthorData.frank.last_name, 'Herbert')
+
+class TestParallelMappedClasses(ParallelLoadTest, unittest.TestCase):
+    env = {'BatchCategoryData': Category, 'BatchProductData': Product, 
+           'BatchAuthorData': Author, 'BrokenProductData': Product, 
+           'LinkedProductData': Product, 'OtherLinkedProductData': Product}
+    
+    def assert_loaded(self, data):
+        eq_(data.BatchProductData.truck.category_id, 1)
+        eq_(data.BatchAuthorData.frank.last_name, 'Herbert')
+        frank = self.fixture.loaded[BatchAuthorData].meta._stored_objects.\
+                                                        get_object('frank')
+        assert frank in self.fixture.session
+    
+    @attr(functional=1)
+    def test_row_references(self):
+        # both DataSets are loaded at once and refer to the same row
+        data = self.fixture.data(LinkedProductData, OtherLinkedProductData)
+        data.setup()
+        try:
+            eq_(data.LinkedProductData.truck.category_id, 1)
+            eq_(data.OtherLinkedProductData.van.category_id, 1)
+            stored = lambda ds, key: self.fixture.loaded[ds].meta.\
+                                            _stored_objects.get_object(key)
+            cars = stored(BatchCategoryData, 'cars')
+            for ds, key in [(LinkedProductData, 'truck'), 
+                            (OtherLinkedProductData, 'van')]:
+                product = stored(ds, key)
+                assert product in self.fixture.session
+                assert product.category is cars
+            eq_(self.count_rows(products), 2)
+        finally:
+            data.teardown()
+        eq_(self.count_rows(categories), 0)
+        eq_(self.count_rows(products), 0)
+
+class BulkInsertTest(object):
+    """tests loading mapped classes in batch mode
+    
+    mix this into a TestCase
+    """
+    bulk_insert = False
+    
+    def setUp(self):
+        if not conf.HEAVY_DSN:
+            raise SkipTest("conf.HEAVY_DSN not defined")
+        self.engine = create_engine(conf.HEAVY_DSN)
+        metadata.bind = self.engine
+        metadata.create_all()
+        clear_mappers()
+        mapper(Category, categories)
+        mapper(Product, products, properties={
+            'category': relation(Category)
+        })
+        mapper(Author, authors)
+        self.fixture = SQLAlchemyFixture(
+            env={'BatchCategoryData': Category, 'BatchProductData': Product, 
+                 'BatchAuthorData': Author}, 
+            engine=self.engine, batch=True, bulk_insert=self.bulk_insert)
+    
+    def tearDown(self):
+        self.fixture.dispose()
+        metadata.drop_all()
+        clear_mappers()
+        self.engine.dispose()
+    
+    def count_rows(self, table):
+        return len(self.engine.execute(table.select()).fetchall())
+    
+    @attr(functional=1)
+    def test_setup_then_teardown(self):
+        data = self.fixture.data(BatchProductData, BatchAuthorData)
+        data.setup()
+        eq_(data.BatchProductData.truck.category_id, 
+            data.BatchCategoryData.cars.id)
+        eq_(data.BatchAuthorData.frank.last_name, 'Herbert')
+        frank = self.fixture.loaded[BatchAuthorData].meta._stored_objects.\
+                                                        get_object('frank')
+        assert frank in self.fixture.session
+        eq_(self.count_rows(categories), 3)
+        eq_(self.count_rows(products), 2)
+        eq_(self.count_rows(authors), 1)
+        data.teardown()
+        eq_(self.count_rows(categories), 0)
+        eq_(self.count_rows(products), 0)
+        eq_(self.count_rows(authors), 0)
+
+    @attr(functional=1)
+    def test_generated_keys_are_flushed_before_they_are_read(self):
+        from fixture.loadable.loadable import LoadReport
+        self.fixture.report = LoadReport()
+        data = self.fixture.data(BatchProductData, BatchAuthorData)
+        data.setup()
+        misc_id = data.BatchCategoryData.misc.id
+        assert misc_id is not None
+        eq_(self.engine.execute(products.select(products.c.id==2)
+                                ).fetchone().category_id, misc_id)
+        data.teardown()
+        # products read the ids of categories, nothing reads products:
+        eq_(self.fixture.report.timings[0].flushes, 1)
+
+class TestMappedClassesInBatch(BulkInsertTest, unittest.TestCase):
+    pass
+
+class TestMappedClassesBulkInsert(BulkInsertTest, unittest.TestCase):
+    bulk_insert = True
+    
+    @attr(functional=1)
+    def test_flush_before_bulk_insert_is_counted(self):
+        from fixture.loadable.loadable import LoadReport
+        self.fixture.report = LoadReport()
+        data = self.fixture.data(BatchAuthorData)
+        data.setup()
+        data.teardown()
+        eq_(self.fixture.report.timings[0].flushes, 1)
+        assert "1 flushes" in self.fixture.report.format(), \
+                                                self.fixture.report.format()
+    
+    @attr(functional=1)
+    def test_bulk_insert_needs_primary_keys_and_no_relationships(self):
+        inserted = []
+        save_bulk = MappedClassMedium.save_bulk
+        def recording_save_bulk(medium, objects, mappings):
+            inserted.append(medium.medium)
+            return save_bulk(medium, objects, mappings)
+        MappedClassMedium.save_bulk = recording_save_bulk
+        try:
+            data = self.fixture.data(BatchProductData, BatchAuthorData)
+            data.setup()
+            data.teardown()
+        finally:
+            MappedClassMedium.save_bulk = save_bulk
+        # misc has no id and products are related to categories:
+        eq_([c.__name__ for c in inserted], ['Author'])
+
+@raises(ValueError)
+def test_parallel_cannot_rollback():
+    SQLAlchemyFixture(parallel=2, unload_strategy='rollback')
+
+@raises(ValueError)
+def test_unknown_unload_strategy():
+    SQLAlchemyFixture(unload_strategy='drop')
+
 class TestTableObjectsExplicitConn(object):
     class CategoryData(DataSet):
         class cars:
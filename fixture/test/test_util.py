@@ -0,0 +1,39 @@
+
+from nose.tools import eq_, raises
+from fixture import DataSet
+from fixture.test import attr
+from fixture.util import ObjRegistry
+
+class FooData(DataSet):
+    class foo:
+        name = 'foo'
+
+class NotData(object):
+    pass
+
+class TestObjRegistry(object):
+    def setUp(self):
+        self.registry = ObjRegistry()
+
+    @attr(unit=True)
+    def test_instances_and_classes_share_an_id(self):
+        foo = FooData()
+        eq_(self.registry.id(foo), id(FooData))
+        eq_(self.registry.id(FooData), id(FooData))
+        eq_(self.registry.id(NotData()), id(NotData))
+        eq_(self.registry.id(NotData), id(NotData))
+
+    @attr(unit=True)
+    def test_lookup(self):
+        foo = FooData()
+        self.registry.register(foo)
+        assert foo in self.registry
+        assert FooData in self.registry
+        assert FooData() in self.registry
+        assert NotData not in self.registry
+        assert self.registry[FooData] is foo
+
+    @attr(unit=True)
+    @raises(KeyError)
+    def test_missing(self):
+        self.registry[FooData]
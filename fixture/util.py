@@ -2,10 +2,14 @@
 """Fixture utilties."""
 
 import sys
-import types
 import logging
 
-from six import reraise
+from six import PY3, reraise
+
+if PY3:
+    ClassType = InstanceType = None
+else:
+    from types import ClassType, InstanceType
 
 
 __all__ = ['DataTestCase']
@@ -30,20 +34,58 @@ class DataTestCase(object):
     ``data``
         ``self.data``, a :class:`Fixture.Data <fixture.base.FixtureData>` instance populated for you after ``setUp()``
     
+    ``read_only``
+        set this to True if no test changes the loaded data.  The datasets 
+        are then loaded once in ``setUpClass()``, shared by all tests in the 
+        class with :meth:`Fixture.shared_data <fixture.base.Fixture.shared_data>` 
+        and unloaded in ``tearDownClass()``
+    
     """
     fixture = None
     data = None
     datasets = []
-    def setUp(self):
-        if self.fixture is None:
+    read_only = False
+    
+    @classmethod
+    def setUpClass(cls):
+        parent = super(DataTestCase, cls)
+        if hasattr(parent, 'setUpClass'):
+            parent.setUpClass()
+        if cls.read_only:
+            cls._check_fixture()
+            cls.shared_data = cls.fixture.shared_data(*cls.datasets, scope=cls)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shared = cls.__dict__.get('shared_data')
+        if shared is not None:
+            del cls.shared_data
+            shared.release()
+        parent = super(DataTestCase, cls)
+        if hasattr(parent, 'tearDownClass'):
+            parent.tearDownClass()
+    
+    @classmethod
+    def _check_fixture(cls):
+        if cls.fixture is None:
             raise NotImplementedError("no concrete fixture to load data with")
-        if not self.datasets:
+        if not cls.datasets:
             raise ValueError("there are no datasets to load")
-        self.data = self.fixture.data(*self.datasets)
-        self.data.setup()
+    
+    def setUp(self):
+        self._check_fixture()
+        if self.read_only:
+            self.data = self.fixture.shared_data(
+                                    *self.datasets, scope=self.__class__)
+        else:
+            self.data = self.fixture.data(*self.datasets)
+            self.data.setup()
     
     def tearDown(self):
-        self.data.teardown()
+        if self.read_only:
+            self.data.release()
+        else:
+            self.data.teardown()
 
 class ObjRegistry:
     """registers objects by class.
@@ -72,21 +114,16 @@ class ObjRegistry:
         return self.id(object) in self.registry
     
     def id(self, object):
-        if hasattr(object, '__class__'):
-            if issubclass(object.__class__, type):
-                # then it's a class...
-                cls = object
-            else:
-                # instance ...
-                cls = object.__class__
-        elif type(object)==types.ClassType:
-            # then it's a classic class (no metaclass)...
-            cls = object
-        else:
-            raise ValueError(
-                    "cannot identify object %s because it isn't an "
-                    "instance or a class" % object)
-        return id(cls)
+        # dispatch on the exact type so that no attribute of object is 
+        # looked up, DataSet instances override __getattribute__
+        kind = type(object)
+        if issubclass(kind, type) or kind is ClassType:
+            # then it's a class...
+            return id(object)
+        elif kind is InstanceType:
+            # an instance of a classic class
+            return id(object.__class__)
+        return id(kind)
     
     def register(self, object):
         id = self.id(object)